@@ -1,8 +1,14 @@
 from io import StringIO
+import os
 import re
+from threading import Lock
 from typing import Any, List, Mapping, Tuple
 from datetime import datetime, timedelta
 import logging
+import time
+
+from flask import g, has_request_context
+from sqlalchemy.orm import make_transient_to_detached
 
 from lcm_engine.db_models.models import db
 from lcm_engine.db_models.user import User as DBUser
@@ -11,6 +17,9 @@ from lcm_engine.db_models.project import Project as DBProject
 from lcm_engine.db_models.user_workspace import (
     UserWorkspace as DBUserWorkspace
 )
+from lcm_engine.metrics import AUTH_SECONDS
+
+MAX_PAGE_SIZE = int(os.getenv("LCM_ENGINE_MAX_PAGE_SIZE", 1000))
 
 
 class AuthError(Exception):
@@ -99,49 +108,169 @@ def get_or_create_user(headers: Mapping[str, str]) -> DBUser:
     return existing_user
 
 
-def authorize_secret(user: DBUser, secret_id: int) -> bool:
-    secret = db.session.execute(
-        db.select(DBSecret).filter_by(id=secret_id)
-    ).first()
+class AuthCache:
+    """Briefly remembers granted authorizations across requests."""
 
-    if not secret:
-        raise AuthError("Secret not found", status_code=404)
+    def __init__(self, ttl: float):
+        self._ttl = ttl
+        self._lock = Lock()
+        self._entries: Mapping[Tuple, Tuple[float, Any]] = dict()
 
-    if secret.Secret.user_id != user.id:
-        msg = (
-            "Secret failed authorization: wanted "
-            f"{user.id}, got {secret.Secret.user_id}"
-        )
-        raise AuthError(msg)
+    def get(self, key: Tuple) -> Any:
+        if self._ttl <= 0:
+            return None
 
-    return True
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            return entry[1]
 
+    def put(self, key: Tuple, value: Any):
+        if self._ttl <= 0:
+            return
 
-def authorize_project(user: DBUser, project_id: int) -> bool:
-    user_workspace = db.session.execute(
-        db.select(DBUserWorkspace)
-        .where(DBUserWorkspace.workspace_id == DBProject.workspace_id)
-        .where(DBUserWorkspace.user_id == user.id)
-        .where(DBProject.id == project_id)
-    ).first()
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+auth_cache = AuthCache(float(os.getenv("LCM_ENGINE_AUTH_CACHE_TTL", 5)))
+
+
+def invalidate_authorizations():
+    auth_cache.clear()
+    if has_request_context():
+        g.pop("lcm_engine_auth", None)
 
-    if not user_workspace:  # if user_workspace is None:
-        raise AuthError("Project failed authorization")
 
-    return user_workspace.UserWorkspace.is_owner
+def _cached(key: Tuple) -> Any:
+    memo = g.setdefault("lcm_engine_auth", dict())
+    value = memo.get(key)
+    if value is None:
+        value = auth_cache.get(key)
+        if value is not None:
+            memo[key] = value
+    return value
 
 
-def authorize_workspace(user: DBUser, workspace_id: int) -> bool:
-    user_workspace = db.session.execute(
-        db.select(DBUserWorkspace).filter_by(
-            user_id=user.id, workspace_id=workspace_id
+def _cache(key: Tuple, value: Any):
+    g.setdefault("lcm_engine_auth", dict())[key] = value
+    auth_cache.put(key, value)
+
+
+def _query_authorization(
+    oidc_id: str,
+    workspace_id: int = None,
+    project_id: int = None,
+    secret_id: int = None,
+):
+    # the user and all requested memberships in a single round-trip
+    columns = [DBUser]
+
+    if workspace_id is not None:
+        columns.append(
+            db.select(DBUserWorkspace.is_owner)
+            .where(DBUserWorkspace.user_id == DBUser.id)
+            .where(DBUserWorkspace.workspace_id == workspace_id)
+            .scalar_subquery()
+            .label("workspace_owner")
+        )
+
+    if project_id is not None:
+        columns.append(
+            db.select(DBUserWorkspace.is_owner)
+            .join(
+                DBProject,
+                DBProject.workspace_id == DBUserWorkspace.workspace_id
+            )
+            .where(DBUserWorkspace.user_id == DBUser.id)
+            .where(DBProject.id == project_id)
+            .scalar_subquery()
+            .label("project_owner")
+        )
+
+    if secret_id is not None:
+        columns.append(
+            db.select(DBSecret.user_id)
+            .where(DBSecret.id == secret_id)
+            .scalar_subquery()
+            .label("secret_user_id")
         )
+
+    return db.session.execute(
+        db.select(*columns).where(DBUser.oidc_identifier == oidc_id)
     ).first()
 
-    if not user_workspace:  # if user_workspace is None:
-        raise AuthError("Workspace failed authorization")
 
-    return user_workspace.UserWorkspace.is_owner
+def _attached_user(user_id: int, oidc_id: str) -> DBUser:
+    user = DBUser(id=user_id, oidc_identifier=oidc_id)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+def _authorize(
+    oidc_id: str,
+    workspace_id: int = None,
+    project_id: int = None,
+    secret_id: int = None,
+) -> Tuple[DBUser, bool]:
+    checks = [
+        (kind, id) for kind, id in (
+            ("secret", secret_id),
+            ("project", project_id),
+            ("workspace", workspace_id),
+        ) if id is not None
+    ]
+
+    user_id = _cached(("user", oidc_id))
+    if user_id is not None:
+        granted = [_cached((kind, user_id, id)) for kind, id in checks]
+        if all(is_owner is not None for is_owner in granted):
+            return _attached_user(user_id, oidc_id), any(granted)
+
+    logging.info(f"Authorizing X-Forwarded-User: {oidc_id}")
+
+    row = _query_authorization(oidc_id, workspace_id, project_id, secret_id)
+    if row is None:
+        logging.info("No user exists, creating a new one")
+        user = _create_user(oidc_id)
+        _cache(("user", oidc_id), user.id)
+        if checks:
+            kind, _ = checks[0]
+            raise AuthError(f"{kind.capitalize()} failed authorization")
+        return user, False
+
+    user = row.User
+    _cache(("user", oidc_id), user.id)
+
+    is_owner_total = False
+    for kind, id in checks:
+        if kind == "secret":
+            if row.secret_user_id is None:
+                raise AuthError("Secret not found", status_code=404)
+            if row.secret_user_id != user.id:
+                msg = (
+                    "Secret failed authorization: wanted "
+                    f"{user.id}, got {row.secret_user_id}"
+                )
+                raise AuthError(msg)
+            is_owner = True
+        else:
+            is_owner = getattr(row, f"{kind}_owner")
+            if is_owner is None:
+                raise AuthError(f"{kind.capitalize()} failed authorization")
+
+        _cache((kind, user.id, id), is_owner)
+        is_owner_total = is_owner_total or is_owner
+
+    return user, is_owner_total
 
 
 def authorize_everything(
@@ -150,25 +279,25 @@ def authorize_everything(
     project_id: int = None,
     secret_id: int = None,
 ):
-    is_owner_total = False
+    start = time.monotonic()
+    oidc_id = headers.get("X-Forwarded-User")
     try:
-        user = get_or_create_user(headers)
+        if oidc_id is None:
+            if workspace_id is None and project_id is None and secret_id is None:
+                return None, False, 0
+            raise AuthError("No X-Forwarded-User header")
 
-        ids = (secret_id, project_id, workspace_id)
-        auth_fs = (
-            authorize_secret,
-            authorize_project,
-            authorize_workspace,
+        user, is_owner_total = _authorize(
+            oidc_id, workspace_id, project_id, secret_id
         )
 
-        for id, auth_f in zip(ids, auth_fs):
-            if id is not None:
-                is_owner = auth_f(user, id)
-                is_owner_total = is_owner_total or is_owner
-
     except Exception as e:
         logging.error(e)
-        raise AuthError(e, status_code=403)
+        AUTH_SECONDS.labels("denied").observe(time.monotonic() - start)
+        msg = e.msg if isinstance(e, AuthError) else str(e)
+        raise AuthError(msg, status_code=403)
+
+    AUTH_SECONDS.labels("allowed").observe(time.monotonic() - start)
 
     return user, is_owner_total, 0
 
@@ -195,3 +324,24 @@ def generate_workspace_owner_map(
         ws_ids,
         ws_owner_map,
     )
+
+
+def paginate(
+    query, id_column, limit: int = None, after: int = None
+) -> Tuple[List[Any], Mapping[str, str]]:
+    # keyset pagination: order by id and continue after the last id seen
+    limit = min(limit or MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+
+    if after is not None:
+        query = query.where(id_column > after)
+
+    rows = db.session.execute(
+        query.order_by(id_column).limit(limit + 1)
+    ).scalars().unique().all()
+
+    headers = dict()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = str(rows[-1].id)
+
+    return rows, headers
@@ -1,26 +1,41 @@
 import binascii
 import logging
-from base64 import b64decode
-from io import StringIO
-from pathlib import Path
-from traceback import print_exc
+import os
 
 import connexion
 from flask import current_app, send_file
-from lcm_engine.controllers.helper import AuthError, authorize_everything
+from sqlalchemy import exists
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import undefer
+from lcm_engine.controllers.helper import (
+    AuthError,
+    authorize_everything,
+    paginate,
+)
+from lcm_engine.db_models.deployment_package import \
+    DeploymentPackage as DBDeploymentPackage
+from lcm_engine.db_models.loader_options import SECRET_DEPLOY_VIEW
 from lcm_engine.db_models.models import db
-from lcm_engine.db_models.project import Project as DBProject
+from lcm_engine.db_models.project import Project as DBProject, ProjectState
+from lcm_engine.db_models.secret import Secret as DBSecret
+from lcm_engine.db_models.secret_workspace import \
+    SecretWorkspace as DBSecretWorkspace
 from lcm_engine.db_models.user_workspace import \
     UserWorkspace as DBUserWorkspace
 from lcm_engine.db_models.workspace import Workspace as DBWorkspace
+from lcm_engine.deployment_package import DeploymentPackage
 from lcm_engine.k8sops.lcm_service import (
+    LCM_SERVICE_KINDS,
+    LCMServiceBinder,
     LCMServiceDeployer,
-    can_ping_lcm_service,
     get_lcm_service_status_phase,
-    construct_namespace_name,
-    undeploy_lcm_service,
+    get_lcm_service_status_phases,
+    probe_lcm_services,
     create_debug_zip
 )
+from lcm_engine.k8sops.provisioner import provisioner
+from lcm_engine.k8sops.teardown import teardown
+from lcm_engine.k8sops.warm_pool import warm_pool
 from lcm_engine.models.connectivity_health import ConnectivityHealth
 from lcm_engine.models.container_health import ContainerHealth
 from lcm_engine.models.entity_creation_status import \
@@ -35,6 +50,8 @@ KNOWN_PROJECT_KINDS = [
     "si.xlab.lcm-service.terraform"
 ]
 
+HEALTH_CHECK_WORKERS = int(os.getenv("LCM_ENGINE_HEALTH_CHECK_WORKERS", 16))
+
 
 def create_workspace_project(workspace_id, project=None):  # noqa: E501
     """Create a new project in the workspace (async)
@@ -51,6 +68,47 @@ def create_workspace_project(workspace_id, project=None):  # noqa: E501
     if connexion.request.is_json:
         project = Project.from_dict(connexion.request.get_json())  # noqa: E501
 
+    read_package = None
+    if project.csar is not None:
+        read_package = lambda: DeploymentPackage.from_base64(project.csar)  # noqa: E731
+    elif project.csar_digest is None:
+        msg = "Either csar or csarDigest is required."
+        logging.error(msg)
+        return dict(msg=msg), 400
+
+    return _create_project(
+        workspace_id,
+        project.name,
+        project.kind,
+        read_package,
+        package_digest=project.csar_digest,
+    )
+
+
+def create_workspace_project_upload(workspace_id, body=None, csar=None):  # noqa: E501
+    """Create a new project in the workspace from an uploaded CSAR (async)
+
+    Secrets applied to the workspace the project is in are only applied on creation. To modify secrets, create a new project.  # noqa: E501
+
+    :param workspace_id:
+    :type workspace_id: int
+    :param body: Project name and kind
+    :type body: dict
+    :param csar: ZIP file of the CSAR
+    :type csar: werkzeug.datastructures.FileStorage
+
+    :rtype: Union[EntityReference, Tuple[EntityReference, int], Tuple[EntityReference, int, Dict[str, str]]
+    """
+
+    return _create_project(
+        workspace_id,
+        body.get("name"),
+        body.get("kind"),
+        lambda: DeploymentPackage.from_stream(csar.stream),
+    )
+
+
+def _create_project(workspace_id, name, kind, read_package, package_digest=None):
     try:
         user, _, status_code = authorize_everything(
             connexion.request.headers, workspace_id=workspace_id
@@ -59,17 +117,17 @@ def create_workspace_project(workspace_id, project=None):  # noqa: E501
         logging.error(err.msg)
         return dict(msg=err.msg), 401
 
-    if project.kind not in KNOWN_PROJECT_KINDS:
+    if kind not in KNOWN_PROJECT_KINDS:
         supported_project_kinds = ", ".join(KNOWN_PROJECT_KINDS)
         msg = (
-            f"Project kind {project.kind} is not one of supported kinds: "
+            f"Project kind {kind} is not one of supported kinds: "
             f"{supported_project_kinds}."
         )
         logging.error(msg)
         return dict(msg=msg), 400
 
     project_with_same_name = db.session.execute(
-        db.select(DBProject).filter_by(name=project.name)
+        db.select(DBProject).filter_by(name=name)
         .join(DBWorkspace)
         .join(DBUserWorkspace)
         .filter(DBUserWorkspace.is_owner is True)
@@ -79,7 +137,7 @@ def create_workspace_project(workspace_id, project=None):  # noqa: E501
 
     if project_with_same_name is not None:
         msg = (
-            f"Project with name {project.name} already exists "
+            f"Project with name {name} already exists "
             f"for the current owner in workspace ID {workspace_id}."
         )
         logging.error(msg)
@@ -90,89 +148,133 @@ def create_workspace_project(workspace_id, project=None):  # noqa: E501
         description=f"No workspace with ID {workspace_id} exists."
     )
 
-    try:
-        binary_csar = b64decode(project.csar)
-    except binascii.Error as err:
-        logging.error(err)
-        return dict(msg=err.msg), 400
+    if db_workspace.terminating:
+        msg = f"Workspace ID {workspace_id} is being deleted."
+        logging.error(msg)
+        return dict(msg=msg), 400
 
-    logging.info(f"Creating project {project.name}.")
+    if read_package is not None:
+        try:
+            package = read_package()
+        except binascii.Error as err:
+            logging.error(err)
+            return dict(msg=str(err)), 400
+
+        if package_digest is not None and package_digest != package.digest:
+            package.close()
+            msg = (
+                f"CSAR digest {package.digest} does not match "
+                f"the given digest {package_digest}."
+            )
+            logging.error(msg)
+            return dict(msg=msg), 400
+    else:
+        # only CSARs of projects in the user's workspaces can be reused
+        db_package = db.session.execute(
+            db.select(DBDeploymentPackage)
+            .filter_by(digest=package_digest)
+            .where(
+                exists()
+                .where(DBProject.package_digest == DBDeploymentPackage.digest)
+                .where(DBProject.workspace_id == DBUserWorkspace.workspace_id)
+                .where(DBUserWorkspace.user_id == user.id)
+            )
+            .options(undefer(DBDeploymentPackage.contents))
+        ).scalar_one_or_none()
+        if db_package is None:
+            msg = (
+                f"No CSAR with digest {package_digest} exists. "
+                "Send the csar instead."
+            )
+            logging.error(msg)
+            return dict(msg=msg), 404
+
+        package = DeploymentPackage.from_bytes(db_package.contents)
+
+    logging.info(f"Creating project {name} from {package}.")
     db_project = DBProject(
-        name=project.name,
+        name=name,
         container_id="unknown",
         available=False,
-        csar=binary_csar,
+        package_digest=package.digest,
         workspace=db_workspace,
-        kind=project.kind,
+        kind=kind,
+        state=ProjectState.PENDING,
     )
 
     try:
+        _store_package(package)
         db.session.add(db_project)
         db.session.commit()
     except Exception as err:
         logging.error(err)
         db.session.rollback()
+        package.close()
         return dict(msg=str(err)), 500
 
-    api_secrets = []
-    for sw in db_workspace.secrets:
-        api_secrets.append(sw.secret.to_api_model(disclose_contents=True))
-
-    if project.kind == "si.xlab.lcm-service.tosca":
-        image = "ghcr.io/xlab-si/xopera-api:0.5.4"
-    elif project.kind == "si.xlab.lcm-service.terraform":
-        image = "registry.gitlab.com/gaia-x/data-infrastructure-federation-services/orc/lcm-service/terraform-lcm-service-api:v0.2.1"
+    db_secrets = db.session.execute(
+        db.select(DBSecret)
+        .join(DBSecretWorkspace)
+        .filter(DBSecretWorkspace.workspace_id == workspace_id)
+        .options(*SECRET_DEPLOY_VIEW)
+    ).scalars().all()
+    api_secrets = [
+        db_secret.to_api_model(disclose_contents=True)
+        for db_secret in db_secrets
+    ]
 
-    project_kind_short = project.kind.split(".")[-1]
+    project_kind_short = kind.split(".")[-1]
+    lcm_service_kind = LCM_SERVICE_KINDS[project_kind_short]
 
     cert_secret_name = current_app.config["LCM_ENGINE_CERTIFICATE_SECRET_NAME"]
 
-    if project_kind_short == "tosca":
-        work_dir = Path("/opera/csar")
-    else:
-        work_dir = Path("/terraform-api")
-
-    # TODO: make this configurable
-    image_pull_secret_name = "docker-registry" if project_kind_short == "terraform" else None
+    # secrets are set up when the pod starts, so only projects without
+    # them can take a running LCM Service from the warm pool
+    deployer_class = LCMServiceDeployer
+    namespace_name = None
+    if not api_secrets:
+        namespace_name = warm_pool.acquire(project_kind_short)
+        if namespace_name is not None:
+            deployer_class = LCMServiceBinder
 
-    deployer = LCMServiceDeployer(
+    deployer = deployer_class(
         workspace_id,
         db_project.id,
         project_kind_short,
 
-        image,
+        lcm_service_kind.image,
         8080,
 
-        work_dir,
-        dict(PYTHONPATH="/app") if project_kind_short == "tosca" else dict(),
+        lcm_service_kind.working_dir,
+        lcm_service_kind.env,
 
-        project.csar,
+        package,
 
         secrets=api_secrets,
 
         hostname=current_app.config["LCM_ENGINE_HOSTNAME"],
         certificate_secret_name=cert_secret_name,
 
-        image_pull_secret_name=image_pull_secret_name,
+        image_pull_secret_name=lcm_service_kind.image_pull_secret_name,
+
+        namespace_name=namespace_name,
     )
 
-    # TODO: run in transaction and asynchronously
     try:
         db_project.container_id = deployer.namespace_name
-        deployer.deploy()
-
-        # TODO: restrict ingress routes to specific users
-
-        db_project.available = True
         db.session.commit()
     except Exception as err:
         logging.error(err)
-        with StringIO() as stream:
-            print_exc(file=stream)
-            logging.debug(stream.getvalue())
         db.session.rollback()
+        deployer.close()
+        if namespace_name is not None:
+            warm_pool.release(project_kind_short, namespace_name)
         return dict(msg=str(err)), 500
 
+    provisioner.submit(
+        current_app._get_current_object(), db_project.id, deployer
+    )
+
     return EntityReference(id=db_project.id), 202
 
 
@@ -199,10 +301,13 @@ def create_workspace_project_debug_package(workspace_id, project_id):  # noqa: E
         logging.error(err.msg)
         return dict(msg=err.msg), err.status_code
 
-    namespace_name = construct_namespace_name(workspace_id, project_id)
+    db_project = db.first_or_404(
+        db.select(DBProject).filter_by(id=project_id),
+        description=f"No project with ID {project_id}"
+    )
 
     try:
-        zip_stream = create_debug_zip(namespace_name)
+        zip_stream = create_debug_zip(db_project.container_id)
     except ValueError as err:
         return dict(msg=str(err)), 500
 
@@ -245,16 +350,29 @@ def delete_workspace_project(workspace_id, project_id):  # noqa: E501
         description=f"No project with ID {project_id}"
     )
 
+    # the provisioner may still create resources in the namespace
+    if db_project.state in (ProjectState.PENDING, ProjectState.DEPLOYING):
+        msg = f"Project ID {project_id} is still being provisioned."
+        logging.error(msg)
+        return dict(msg=msg), 409
+
     try:
-        undeploy_lcm_service(workspace_id, project_id)
-        db.session.delete(db_project)
+        db_project.state = ProjectState.TERMINATING
+        db_project.available = False
         db.session.commit()
     except Exception as err:
         logging.error(err)
         db.session.rollback()
         return dict(msg=str(err)), 500
 
-    return None, 200
+    # the namespace is deleted and the project forgotten in the background
+    teardown.submit(
+        current_app._get_current_object(),
+        db_project.workspace_id,
+        [db_project.id],
+    )
+
+    return None, 202
 
 
 def describe_workspace_project(workspace_id, project_id):  # noqa: E501
@@ -311,13 +429,33 @@ def describe_workspace_project_status(workspace_id, project_id):  # noqa: E501
         logging.error(err.msg)
         return dict(msg=err.msg), 401
 
-    db.first_or_404(
+    db_project = db.first_or_404(
         db.select(DBProject).filter_by(id=project_id),
         description=f"No project with ID {project_id}"
     )
 
+    if db_project.state == ProjectState.TERMINATING:
+        status = db_project.state
+        progress = teardown.progress(project_id)
+        if progress is not None:
+            if progress.error:
+                status = f"{status}: {progress.error}"
+            elif progress.step:
+                status = f"{status}: {progress.step}"
+        return EntityCreationStatus(finished=False, status=status), 200
+
+    if db_project.state != ProjectState.AVAILABLE:
+        status = db_project.state
+        progress = provisioner.progress(project_id)
+        if progress is not None:
+            if progress.error:
+                status = f"{status}: {progress.error}"
+            elif progress.step and status == ProjectState.DEPLOYING:
+                status = f"{status}: {progress.step}"
+        return EntityCreationStatus(finished=False, status=status), 200
+
     try:
-        status = get_lcm_service_status_phase(workspace_id, project_id)
+        status = get_lcm_service_status_phase(db_project.container_id)
     except Exception as ex:
         msg = f"Could not obtain Pod status: {ex}"
         logging.error(str(ex))
@@ -331,13 +469,17 @@ def describe_workspace_project_status(workspace_id, project_id):  # noqa: E501
     )
 
 
-def list_workspace_projects(workspace_id):  # noqa: E501
+def list_workspace_projects(workspace_id, limit=None, after=None):  # noqa: E501
     """List projects in a workspace
 
      # noqa: E501
 
     :param workspace_id:
     :type workspace_id: int
+    :param limit: Maximum number of items to return
+    :type limit: int
+    :param after: Return items after the given cursor, taken from the X-Next-Cursor header of the previous page
+    :type after: int
 
     :rtype: Union[List[Project], Tuple[List[Project], int], Tuple[List[Project], int, Dict[str, str]]
     """
@@ -351,14 +493,16 @@ def list_workspace_projects(workspace_id):  # noqa: E501
         logging.error(err.msg)
         return dict(msg=err.msg), 401
 
-    db_workspace = db.first_or_404(
-        db.select(DBWorkspace).filter_by(id=workspace_id),
-        description=f"No workspace with ID {workspace_id}"
+    db_projects, headers = paginate(
+        db.select(DBProject).filter_by(workspace_id=workspace_id),
+        DBProject.id,
+        limit=limit,
+        after=after,
     )
 
-    api_projects = [p.to_api_model() for p in db_workspace.projects]
+    api_projects = [p.to_api_model() for p in db_projects]
 
-    return api_projects, 200
+    return api_projects, 200, headers
 
 
 def replace_workspace_project(workspace_id, project_id, project):  # noqa: E501
@@ -464,18 +608,88 @@ def workspace_project_health(workspace_id, project_id):  # noqa: E501
         logging.error(err.msg)
         return dict(msg=err.msg), 401
 
-    result = ProjectHealth(
-        connectivity=ConnectivityHealth.NONE,
-        container=ContainerHealth.UNKNOWN
+    db_project = db.first_or_404(
+        db.select(DBProject).filter_by(id=project_id),
+        description=f"No project with ID {project_id}"
     )
-
-    namespace_name = construct_namespace_name(workspace_id, project_id)
+    namespace_name = db_project.container_id
 
     try:
-        pod_phase = get_lcm_service_status_phase(workspace_id, project_id)
+        pod_phase = get_lcm_service_status_phase(namespace_name)
     except Exception as err:
         logging.error(f"Cannot obtain pod state: {err}")
-        return result, 200
+        pod_phase = None
+
+    connectivity = None
+    if _needs_probe(pod_phase):
+        connectivity = probe_lcm_services([namespace_name])[namespace_name]
+
+    return _project_health(pod_phase, connectivity), 200
+
+
+def workspace_health(workspace_id):  # noqa: E501
+    """Check the status of all projects in a workspace
+
+     # noqa: E501
+
+    :param workspace_id:
+    :type workspace_id: int
+
+    :rtype: Union[Dict[str, ProjectHealth], Tuple[Dict[str, ProjectHealth], int], Tuple[Dict[str, ProjectHealth], int, Dict[str, str]]
+    """
+
+    try:
+        _, _, status_code = authorize_everything(
+            connexion.request.headers,
+            workspace_id=workspace_id,
+        )
+    except AuthError as err:
+        logging.error(err.msg)
+        return dict(msg=err.msg), 401
+
+    db_workspace = db.first_or_404(
+        db.select(DBWorkspace).filter_by(id=workspace_id),
+        description=f"No workspace with ID {workspace_id}"
+    )
+
+    namespace_names = {p.id: p.container_id for p in db_workspace.projects}
+    if not namespace_names:
+        return dict(), 200
+
+    try:
+        pod_phases = get_lcm_service_status_phases(
+            list(namespace_names.values())
+        )
+    except Exception as err:
+        logging.error(f"Cannot obtain pod states: {err}")
+        pod_phases = dict()
+
+    # only projects in an unknown phase are probed, all at once
+    connectivity = probe_lcm_services(
+        [
+            namespace_name for namespace_name in namespace_names.values()
+            if _needs_probe(pod_phases.get(namespace_name))
+        ],
+        concurrency=HEALTH_CHECK_WORKERS,
+    )
+
+    return {
+        str(project_id): _project_health(
+            pod_phases.get(namespace_name), connectivity.get(namespace_name)
+        )
+        for project_id, namespace_name in namespace_names.items()
+    }, 200
+
+
+def _needs_probe(pod_phase):
+    return pod_phase is not None and pod_phase.lower() == "unknown"
+
+
+def _project_health(pod_phase, connectivity=None):
+    result = ProjectHealth(
+        connectivity=ConnectivityHealth.NONE,
+        container=ContainerHealth.UNKNOWN
+    )
 
     if pod_phase:
         pod_phase = pod_phase.lower()
@@ -485,9 +699,28 @@ def workspace_project_health(workspace_id, project_id):  # noqa: E501
             result.connectivity = ConnectivityHealth.LAYER5
         elif pod_phase != "unknown":
             result.container = ContainerHealth.STOPPED
-        else:  # unknown
-            can_ping = can_ping_lcm_service(namespace_name)
-            if can_ping:
-                result.connectivity = ConnectivityHealth.LAYER3
+        elif connectivity is not None:
+            result.connectivity = connectivity
+
+    return result
+
 
-    return result, 200
+def _store_package(package):
+    package_exists = db.session.execute(
+        db.select(DBDeploymentPackage.digest)
+        .filter_by(digest=package.digest)
+    ).first()
+    if package_exists:
+        logging.info(f"Reusing stored deployment package {package.digest}")
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(DBDeploymentPackage(
+                digest=package.digest,
+                contents=package.read(),
+                size=package.size,
+            ))
+    except IntegrityError:
+        # stored by a concurrent request in the meantime
+        logging.info(f"Reusing stored deployment package {package.digest}")
@@ -5,9 +5,14 @@ from base64 import b64decode
 
 import connexion
 
-from lcm_engine.controllers.helper import AuthError, authorize_everything
+from lcm_engine.controllers.helper import (
+    AuthError,
+    authorize_everything,
+    paginate,
+)
 from lcm_engine.db_models.env_secret import EnvSecret as DBEnvSecret
 from lcm_engine.db_models.file_secret import FileSecret as DBFileSecret
+from lcm_engine.db_models.loader_options import SECRET_API_VIEW
 from lcm_engine.db_models.models import db
 from lcm_engine.db_models.secret import Secret as DBSecret
 from lcm_engine.db_models.secret_workspace import \
@@ -242,18 +247,23 @@ def describe_secret(secret_id):  # noqa: E501
         return LCMError(msg=err.msg), err.status_code
 
     db_secret = db.first_or_404(
-        db.select(DBSecret).filter_by(id=secret_id),
+        db.select(DBSecret).filter_by(id=secret_id).options(*SECRET_API_VIEW),
         description=f"No secret with ID {secret_id}"
     )
 
     return db_secret.to_api_model(), 200
 
 
-def get_secrets():  # noqa: E501
+def get_secrets(limit=None, after=None):  # noqa: E501
     """List available secrets
 
      # noqa: E501
 
+    :param limit: Maximum number of items to return
+    :type limit: int
+    :param after: Return items after the given cursor, taken from the X-Next-Cursor header of the previous page
+    :type after: int
+
     :rtype: Union[List[Secret], Tuple[List[Secret], int], Tuple[List[Secret], int, Dict[str, str]]
     """
 
@@ -265,27 +275,36 @@ def get_secrets():  # noqa: E501
         logging.error(err.msg)
         return dict(msg=err.msg), 401
 
-    db_secrets = db.session.execute(
-        db.select(DBSecret).filter_by(user_id=user.id)
-    ).all()
+    db_secrets, headers = paginate(
+        db.select(DBSecret)
+        .filter_by(user_id=user.id)
+        .options(*SECRET_API_VIEW),
+        DBSecret.id,
+        limit=limit,
+        after=after,
+    )
 
-    if not db_secrets:
+    if not db_secrets and after is None:
         msg = f"User ID {user.id} has no secrets"
         logging.error(msg)
         return dict(msg=msg), 404
 
-    api_secrets = [dbs.Secret.to_api_model() for dbs in db_secrets]
+    api_secrets = [dbs.to_api_model() for dbs in db_secrets]
 
-    return api_secrets, 200
+    return api_secrets, 200, headers
 
 
-def list_workspace_secrets(workspace_id):  # noqa: E501
+def list_workspace_secrets(workspace_id, limit=None, after=None):  # noqa: E501
     """List secrets assigned to the workspace
 
      # noqa: E501
 
     :param workspace_id:
     :type workspace_id: int
+    :param limit: Maximum number of items to return
+    :type limit: int
+    :param after: Return items after the given cursor, taken from the X-Next-Cursor header of the previous page
+    :type after: int
 
     :rtype: Union[List[Secret], Tuple[List[Secret], int], Tuple[List[Secret], int, Dict[str, str]]
     """
@@ -299,14 +318,19 @@ def list_workspace_secrets(workspace_id):  # noqa: E501
         logging.error(err.msg)
         return dict(msg=err.msg), 401
 
-    db_workspace = db.first_or_404(
-        db.select(DBWorkspace).filter_by(id=workspace_id),
-        description=f"No workspace with ID {workspace_id}"
+    db_secrets, headers = paginate(
+        db.select(DBSecret)
+        .join(DBSecretWorkspace)
+        .filter(DBSecretWorkspace.workspace_id == workspace_id)
+        .options(*SECRET_API_VIEW),
+        DBSecret.id,
+        limit=limit,
+        after=after,
     )
 
-    api_secrets = [sw.secret.to_api_model() for sw in db_workspace.secrets]
+    api_secrets = [dbs.to_api_model() for dbs in db_secrets]
 
-    return api_secrets, 200
+    return api_secrets, 200, headers
 
 
 def remove_workspace_secret(workspace_id, secret_id):  # noqa: E501
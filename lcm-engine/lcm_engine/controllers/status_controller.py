@@ -1,7 +1,8 @@
 import logging
 
-from lcm_engine.db_models.models import db
-from lcm_engine.k8sops import k8sclient
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from lcm_engine.health_checker import health_checker
 from lcm_engine.models.health_response import HealthResponse  # noqa: E501
 
 
@@ -14,31 +15,51 @@ def health():  # noqa: E501
     :rtype: Union[HealthResponse, Tuple[HealthResponse, int], Tuple[HealthResponse, int, Dict[str, str]]
     """
 
-    logging.info("Checking health")
+    return health_ready()
+
+
+def health_live():  # noqa: E501
+    """Check if the application is running
+
+    Answers without contacting any dependency # noqa: E501
+
+
+    :rtype: Union[HealthResponse, Tuple[HealthResponse, int], Tuple[HealthResponse, int, Dict[str, str]]
+    """
+
+    return (
+        HealthResponse(dependencies=[], healthy=True, name="application"),
+        200,
+    )
 
-    dependencies = []
 
-    logging.info("Checking database")
-    database_ok = True
-    query = "select * from user limit 1"
-    logging.debug(f"Executing query: {query}")
-    try:
-        db.session.execute(db.text(query)).all()
-    except Exception as ex:
-        logging.error(f"Querying database failed: {ex}")
-        database_ok = False
-    dependencies.append(HealthResponse(healthy=database_ok, name="database"))
+def health_ready():  # noqa: E501
+    """Check if the application can serve requests
 
-    k8s_ok = k8sclient.check_connectivity()
-    dependencies.append(HealthResponse(healthy=k8s_ok, name="k8s"))
+    Reports the last result of the periodic database and k8s checks # noqa: E501
 
-    app_ok = all(dependency.healthy for dependency in dependencies)
 
-    status_code = 200 if app_ok else 503
+    :rtype: Union[HealthResponse, Tuple[HealthResponse, int], Tuple[HealthResponse, int, Dict[str, str]]
+    """
+
+    app_health = health_checker.status()
+    if not app_health.healthy:
+        logging.warning("Application is not ready")
+
+    return app_health, 200 if app_health.healthy else 503
+
+
+def metrics():  # noqa: E501
+    """Get application metrics
+
+    Metrics in the Prometheus text exposition format # noqa: E501
+
+
+    :rtype: Union[str, Tuple[str, int], Tuple[str, int, Dict[str, str]]
+    """
 
     return (
-        HealthResponse(
-            dependencies=dependencies, healthy=app_ok, name="application"
-        ),
-        status_code,
+        generate_latest().decode("utf-8"),
+        200,
+        {"Content-Type": CONTENT_TYPE_LATEST},
     )
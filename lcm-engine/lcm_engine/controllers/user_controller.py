@@ -10,6 +10,7 @@ from lcm_engine.models.workspace_user_authorization_request import (
 )  # noqa: E501
 from lcm_engine.controllers.helper import (
     get_or_create_user,
+    invalidate_authorizations,
     logout_cookie,
     authorize_everything,
     AuthError,
@@ -133,6 +134,8 @@ def authorize_workspace_user(
         logging.error(f"Error authorizing workspace user: {err}.")
         db.session.rollback()
         return LCMError(msg=str(err)), 500
+    finally:
+        invalidate_authorizations()
 
     logging.info("Authorization success.")
 
@@ -198,6 +201,8 @@ def deauthorize_workspace_user(workspace_id, deauthorization_request):  # noqa:
         logging.error(err)
         db.session.rollback()
         return None, 500
+    finally:
+        invalidate_authorizations()
 
     logging.info("Deauthorization success.")
 
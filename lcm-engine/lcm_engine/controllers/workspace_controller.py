@@ -1,6 +1,7 @@
 import logging
 
 import connexion
+from flask import current_app
 
 from lcm_engine.models.error import Error as LCMError  # noqa: E501
 from lcm_engine.models.workspace import Workspace  # noqa: E501
@@ -9,13 +10,18 @@ from lcm_engine.controllers.helper import (
     AuthError,
     authorize_everything,
     generate_workspace_owner_map,
+    invalidate_authorizations,
+    paginate,
 )
 
+from lcm_engine.db_models.loader_options import WORKSPACE_API_VIEW
 from lcm_engine.db_models.models import db
+from lcm_engine.db_models.project import Project as DBProject, ProjectState
 from lcm_engine.db_models.workspace import Workspace as DBWorkspace
 from lcm_engine.db_models.user_workspace import (
     UserWorkspace as DBUserWorkspace
 )
+from lcm_engine.k8sops.teardown import teardown
 
 
 def create_workspace(workspace=None):  # noqa: E501
@@ -82,15 +88,50 @@ def delete_workspace(workspace_id):  # noqa: E501
         description=f"No workspace with ID {workspace_id} exists."
     )
 
+    db_projects = db.session.execute(
+        db.select(DBProject).filter_by(workspace_id=workspace_id)
+    ).scalars().all()
+
+    # the provisioner may still create resources in their namespaces
+    provisioning = [
+        p.id for p in db_projects
+        if p.state in (ProjectState.PENDING, ProjectState.DEPLOYING)
+    ]
+    if provisioning:
+        msg = (
+            f"Projects with IDs {provisioning} in workspace ID {workspace_id} "
+            "are still being provisioned."
+        )
+        logging.error(msg)
+        return dict(msg=msg), 409
+
     try:
-        db.session.delete(db_workspace)
+        if not db_projects:
+            db.session.delete(db_workspace)
+            db.session.commit()
+            return None, 200
+
+        for db_project in db_projects:
+            db_project.state = ProjectState.TERMINATING
+            db_project.available = False
+        db_workspace.terminating = True
         db.session.commit()
     except Exception as err:
         logging.error(err)
         db.session.rollback()
         return None, 500
+    finally:
+        invalidate_authorizations()
+
+    # all namespaces are deleted concurrently, the workspace after them
+    teardown.submit(
+        current_app._get_current_object(),
+        workspace_id,
+        [p.id for p in db_projects],
+        delete_workspace=True,
+    )
 
-    return None, 200
+    return None, 202
 
 
 def describe_workspace(workspace_id):  # noqa: E501
@@ -114,18 +155,25 @@ def describe_workspace(workspace_id):  # noqa: E501
         return dict(msg=err.msg), 401
 
     db_workspace = db.first_or_404(
-        db.select(DBWorkspace).filter_by(id=workspace_id),
+        db.select(DBWorkspace)
+        .filter_by(id=workspace_id)
+        .options(*WORKSPACE_API_VIEW),
         description=f"No workspace with ID {workspace_id}."
     )
 
     return db_workspace.to_api_model(is_owner), 200
 
 
-def get_workspaces():  # noqa: E501
+def get_workspaces(limit=None, after=None):  # noqa: E501
     """List available workspaces
 
      # noqa: E501
 
+    :param limit: Maximum number of items to return
+    :type limit: int
+    :param after: Return items after the given cursor, taken from the X-Next-Cursor header of the previous page
+    :type after: int
+
     :rtype: Union[List[Workspace], Tuple[List[Workspace], int], Tuple[List[Workspace], int, Dict[str, str]]
     """
 
@@ -139,21 +187,26 @@ def get_workspaces():  # noqa: E501
 
     workspace_ids, wo_map = generate_workspace_owner_map(user.id)
 
-    db_workspaces = db.session.execute(
-        db.select(DBWorkspace).where(DBWorkspace.id.in_(workspace_ids))
-    ).all()
+    db_workspaces, headers = paginate(
+        db.select(DBWorkspace)
+        .where(DBWorkspace.id.in_(workspace_ids))
+        .options(*WORKSPACE_API_VIEW),
+        DBWorkspace.id,
+        limit=limit,
+        after=after,
+    )
 
-    if not db_workspaces:
+    if not db_workspaces and after is None:
         msg = f"No workspaces owned by user ID {user.id}"
         logging.error(msg)
         return dict(msg=msg), 404
 
     api_workspaces = [
-        dbw.Workspace.to_api_model(wo_map[dbw.Workspace.id] == user.id)
+        dbw.to_api_model(wo_map[dbw.id] == user.id)
         for dbw in db_workspaces
     ]
 
-    return api_workspaces, 200
+    return api_workspaces, 200, headers
 
 
 def replace_workspace(workspace_id, workspace):  # noqa: E501
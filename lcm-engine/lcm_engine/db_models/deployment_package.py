@@ -0,0 +1,25 @@
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    LargeBinary,
+    String,
+)
+from sqlalchemy.orm import deferred
+
+from lcm_engine.db_models.models import db
+
+
+class DeploymentPackage(db.Model):
+    __tablename__ = "deployment_package"
+    __table_args__ = dict(schema="public")
+
+    # hex-encoded SHA-256 of the contents
+    digest = Column(String(64), primary_key=True)
+    # only loaded when deploying, see undefer(DeploymentPackage.contents)
+    contents = deferred(Column(LargeBinary, nullable=False))
+    size = Column(BigInteger, nullable=False)
+
+    projects = db.relationship("Project", back_populates="package")
+
+    def __repr__(self):
+        return f"<DeploymentPackage {self.digest}>"
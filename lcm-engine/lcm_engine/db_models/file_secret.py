@@ -6,6 +6,7 @@ from sqlalchemy import (
     LargeBinary,
     ForeignKey,
 )
+from sqlalchemy.orm import deferred
 from lcm_engine.db_models.models import db
 from lcm_engine.models.secret_file import SecretFile
 
@@ -16,7 +17,8 @@ class FileSecret(db.Model):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     path = Column(String, nullable=False)
-    contents = Column(LargeBinary, nullable=False)
+    # only loaded when disclosed, see undefer(FileSecret.contents)
+    contents = deferred(Column(LargeBinary, nullable=False))
     # TODO: figure out how to enable extensions (i.e., pgcrypto) for a
     # non-super user in postgresql and then use the following computed column
     # contents_hash = Column(
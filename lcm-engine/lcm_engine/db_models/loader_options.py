@@ -0,0 +1,37 @@
+from sqlalchemy.orm import selectinload
+
+# building the options configures the mappers, which needs every model that
+# the relationships refer to by name
+from lcm_engine.db_models import (  # noqa: F401
+    deployment_package,
+    env_secret,
+    project,
+    secret_workspace,
+    user,
+    user_workspace,
+)
+from lcm_engine.db_models.file_secret import FileSecret
+from lcm_engine.db_models.secret import Secret
+from lcm_engine.db_models.workspace import Workspace
+
+# Loader options for each view of a model. A query that is rendered with
+# to_api_model() should apply the matching view, so that relationships are
+# loaded with one extra statement each, instead of one per row.
+
+SECRET_API_VIEW = (
+    selectinload(Secret.workspaces),
+    selectinload(Secret.file_secrets),
+    selectinload(Secret.env_secrets),
+)
+
+# secrets that are mounted into an LCM Service, with their file contents
+SECRET_DEPLOY_VIEW = (
+    selectinload(Secret.workspaces),
+    selectinload(Secret.file_secrets).undefer(FileSecret.contents),
+    selectinload(Secret.env_secrets),
+)
+
+WORKSPACE_API_VIEW = (
+    selectinload(Workspace.projects),
+    selectinload(Workspace.secrets),
+)
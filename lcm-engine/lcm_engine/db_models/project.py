@@ -2,7 +2,6 @@ from sqlalchemy import (
     Column,
     Integer,
     String,
-    LargeBinary,
     Boolean,
     ForeignKey,
 )
@@ -11,6 +10,14 @@ from lcm_engine.models.project import Project as ApiProject
 from lcm_engine.db_models.models import db
 
 
+class ProjectState:
+    PENDING = "pending"
+    DEPLOYING = "deploying"
+    AVAILABLE = "available"
+    FAILED = "failed"
+    TERMINATING = "terminating"
+
+
 class Project(db.Model):
     __tablename__ = "project"
     __table_args__ = dict(schema="public")
@@ -19,18 +26,23 @@ class Project(db.Model):
     name = Column(String, nullable=False)
     container_id = Column(String, nullable=False)
     available = Column(Boolean, nullable=False)
-    csar = Column(LargeBinary, nullable=False)
+    package_digest = Column(
+        String(64), ForeignKey("deployment_package.digest"), nullable=False
+    )
     kind = Column(String, nullable=False)
+    state = Column(String, nullable=False, default=ProjectState.PENDING)
 
     workspace_id = Column(Integer, ForeignKey("workspace.id"), nullable=False)
 
     workspace = db.relationship("Workspace", back_populates="projects")
+    package = db.relationship("DeploymentPackage", back_populates="projects")
 
     def to_api_model(self):
         return ApiProject(
             id=self.id,
             name=self.name,
             workspace=self.workspace_id,
+            csar_digest=self.package_digest,
             kind=self.kind
         )
 
@@ -0,0 +1,20 @@
+from sqlalchemy import (
+    Column,
+    Integer,
+)
+
+from lcm_engine.db_models.models import db
+
+# Increase whenever the tables change and document the migration. 1 is the
+# first schema with the deployment_package table.
+SCHEMA_VERSION = 1
+
+
+class SchemaVersion(db.Model):
+    __tablename__ = "schema_version"
+    __table_args__ = dict(schema="public")
+
+    version = Column(Integer, primary_key=True)
+
+    def __repr__(self):
+        return f"<SchemaVersion {self.version}>"
@@ -28,7 +28,7 @@ class Secret(db.Model):
         kwargs = dict(
             id=self.id,
             name=self.name,
-            workspaces=[sw.workspace.id for sw in self.workspaces],
+            workspaces=[sw.workspace_id for sw in self.workspaces],
         )
         if self.file_secrets:
             for file_secret in self.file_secrets:
@@ -1,4 +1,5 @@
 from sqlalchemy import (
+    Boolean,
     Column,
     Integer,
     String,
@@ -14,6 +15,8 @@ class Workspace(db.Model):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     name = Column(String, nullable=False)
+    # deleted once the teardown of its last project finishes
+    terminating = Column(Boolean, nullable=False, default=False)
 
     users = db.relationship(
         "UserWorkspace", back_populates="workspace", cascade="all, delete-orphan"
@@ -26,7 +29,7 @@ class Workspace(db.Model):
             id=self.id,
             name=self.name,
             projects=[p.id for p in self.projects],
-            secrets=[sw.secret.id for sw in self.secrets],
+            secrets=[sw.secret_id for sw in self.secrets],
             is_owner=is_owner,
         )
 
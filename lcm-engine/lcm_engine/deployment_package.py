@@ -0,0 +1,90 @@
+import binascii
+import os
+from base64 import b64decode, b64encode
+from hashlib import sha256
+from tempfile import SpooledTemporaryFile
+from typing import BinaryIO, Iterator
+
+CHUNK_SIZE = 3 * 2 ** 18  # multiple of 3 to base64-encode in chunks
+SPOOL_SIZE = int(os.getenv("LCM_ENGINE_PACKAGE_SPOOL_SIZE", 2 ** 20))
+
+
+class DeploymentPackage:
+    """A deployment package (CSAR) spooled to disk.
+
+    Packages larger than ``SPOOL_SIZE`` bytes are kept in a temporary file
+    and hashed while they are written, so the same buffer can be handed to
+    the database and to the config map without keeping extra copies.
+    """
+
+    def __init__(self):
+        self._file = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+        self._hash = sha256()
+        self._size = 0
+
+    @classmethod
+    def from_stream(cls, stream: BinaryIO) -> "DeploymentPackage":
+        package = cls()
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            package.write(chunk)
+        return package
+
+    @classmethod
+    def from_bytes(cls, contents: bytes) -> "DeploymentPackage":
+        package = cls()
+        package.write(contents)
+        return package
+
+    @classmethod
+    def from_base64(cls, b64_contents: str) -> "DeploymentPackage":
+        b64_contents = "".join(b64_contents.split())
+        if len(b64_contents) % 4 != 0:
+            raise binascii.Error("Incorrect base64 padding")
+
+        package = cls()
+        b64_chunk_size = CHUNK_SIZE // 3 * 4
+        for start in range(0, len(b64_contents), b64_chunk_size):
+            package.write(b64decode(
+                b64_contents[start:start + b64_chunk_size], validate=True
+            ))
+        return package
+
+    @property
+    def digest(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def write(self, chunk: bytes):
+        self._file.write(chunk)
+        self._hash.update(chunk)
+        self._size += len(chunk)
+
+    def read(self) -> bytes:
+        self._file.seek(0)
+        return self._file.read()
+
+    def chunks(self) -> Iterator[bytes]:
+        self._file.seek(0)
+        return iter(lambda: self._file.read(CHUNK_SIZE), b"")
+
+    def b64encode(self) -> str:
+        self._file.seek(0)
+        return "".join(
+            b64encode(chunk).decode("ascii")
+            for chunk in iter(lambda: self._file.read(CHUNK_SIZE), b"")
+        )
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __repr__(self):
+        return f"<DeploymentPackage {self.digest} ({self.size} B)>"
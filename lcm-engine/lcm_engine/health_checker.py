@@ -0,0 +1,124 @@
+import logging
+import os
+import time
+from threading import Event, Lock, Thread
+from typing import List
+
+from flask import Flask
+
+from lcm_engine.db_models.models import db
+from lcm_engine.k8sops import k8sclient
+from lcm_engine.models.health_response import HealthResponse
+
+
+class HealthChecker:
+    """Health of LCM Engine dependencies, checked in the background.
+
+    Once started, the database and Kubernetes are checked every
+    ``interval`` seconds and health requests only read the last result.
+    Results older than ``max_age`` seconds count as unhealthy, since the
+    checker itself got stuck.
+    """
+
+    def __init__(self, interval: float = 10.0, max_age: float = None):
+        self._interval = interval
+        self._max_age = max_age if max_age is not None else 3 * interval
+
+        self._lock = Lock()
+        self._dependencies: List[HealthResponse] = None
+        self._checked_at = None
+        self._stopped = Event()
+        self._thread = None
+
+    def start(self, flask_app: Flask):
+        if self._thread is not None:
+            return
+
+        logging.info(f"Checking dependencies every {self._interval} s")
+        self._stopped.clear()
+        self._thread = Thread(
+            target=self._run,
+            args=(flask_app,),
+            name="lcm-health-checker",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def check(self) -> HealthResponse:
+        dependencies = [
+            HealthResponse(healthy=self._check_database(), name="database"),
+            HealthResponse(healthy=self._check_k8s(), name="k8s"),
+        ]
+
+        with self._lock:
+            self._dependencies = dependencies
+            self._checked_at = time.monotonic()
+
+        return self._response(dependencies, fresh=True)
+
+    def status(self) -> HealthResponse:
+        # without the background thread, check on demand
+        if self._thread is None:
+            return self.check()
+
+        with self._lock:
+            dependencies = self._dependencies
+            checked_at = self._checked_at
+
+        if dependencies is None:
+            return HealthResponse(
+                dependencies=[], healthy=False, name="application"
+            )
+
+        fresh = time.monotonic() - checked_at <= self._max_age
+        if not fresh:
+            logging.error("Dependency health results are stale")
+
+        return self._response(dependencies, fresh)
+
+    def _response(
+        self, dependencies: List[HealthResponse], fresh: bool
+    ) -> HealthResponse:
+        return HealthResponse(
+            dependencies=dependencies,
+            healthy=fresh and all(d.healthy for d in dependencies),
+            name="application",
+        )
+
+    def _check_database(self) -> bool:
+        logging.debug("Checking database")
+        try:
+            db.session.execute(db.text("select 1")).all()
+            return True
+        except Exception as ex:
+            logging.error(f"Querying database failed: {ex}")
+            db.session.rollback()
+            return False
+
+    def _check_k8s(self) -> bool:
+        try:
+            return k8sclient.check_connectivity()
+        except Exception as ex:
+            logging.error(f"Connecting to k8s failed: {ex}")
+            return False
+
+    def _run(self, flask_app: Flask):
+        while not self._stopped.is_set():
+            with flask_app.app_context():
+                try:
+                    self.check()
+                except Exception as err:
+                    logging.error(f"Cannot check dependencies: {err}")
+                finally:
+                    db.session.remove()
+            self._stopped.wait(self._interval)
+
+        self._thread = None
+
+
+health_checker = HealthChecker(
+    interval=float(os.getenv("LCM_ENGINE_HEALTH_CHECK_INTERVAL", 10))
+)
@@ -0,0 +1,103 @@
+import logging
+from typing import Any, Iterable, List, Mapping, Tuple
+
+from kubernetes.client import ApiClient
+
+from lcm_engine.k8sops.k8sclient import k8s
+
+FIELD_MANAGER = "lcm-engine"
+
+# kind: (plural, namespaced)
+KINDS = {
+    "Namespace": ("namespaces", False),
+    "ConfigMap": ("configmaps", True),
+    "Secret": ("secrets", True),
+    "Service": ("services", True),
+    "Deployment": ("deployments", True),
+    "Middleware": ("middlewares", True),
+    "IngressRoute": ("ingressroutes", True),
+}
+
+
+def without_nulls(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {
+            key: without_nulls(item)
+            for key, item in value.items()
+            if item is not None
+        }
+    if isinstance(value, list):
+        return [without_nulls(item) for item in value]
+    return value
+
+
+def resource_path(manifest: Mapping[str, Any]) -> str:
+    path, path_params = resource_path_template(manifest)
+    for key, value in path_params.items():
+        path = path.replace(f"{{{key}}}", value)
+    return path
+
+
+def resource_path_template(
+    manifest: Mapping[str, Any]
+) -> Tuple[str, Mapping[str, str]]:
+    api_version = manifest["apiVersion"]
+    kind = manifest["kind"]
+    metadata = manifest["metadata"]
+
+    try:
+        plural, namespaced = KINDS[kind]
+    except KeyError:
+        raise ValueError(f"Unsupported resource kind: {kind}")
+
+    if "/" in api_version:
+        path = f"/apis/{api_version}"
+    else:
+        path = f"/api/{api_version}"
+
+    path_params = dict(name=metadata["name"])
+    if namespaced:
+        path = f"{path}/namespaces/{{namespace}}"
+        path_params["namespace"] = metadata["namespace"]
+
+    return f"{path}/{plural}/{{name}}", path_params
+
+
+class ServerSideApplier:
+    def __init__(
+        self,
+        api_client: ApiClient = None,
+        field_manager: str = FIELD_MANAGER,
+        force_conflicts: bool = True,
+    ):
+        self._api_client = api_client or k8s.api_client
+        self._field_manager = field_manager
+        self._force_conflicts = force_conflicts
+
+    def apply(self, manifest: Mapping[str, Any]) -> Mapping[str, Any]:
+        path, path_params = resource_path_template(manifest)
+        logging.info(f"Apply {manifest['kind']} {resource_path(manifest)}")
+
+        query_params = [("fieldManager", self._field_manager)]
+        if self._force_conflicts:
+            query_params.append(("force", "true"))
+
+        return self._api_client.call_api(
+            path,
+            "PATCH",
+            path_params=path_params,
+            query_params=query_params,
+            header_params={
+                "Accept": "application/json",
+                "Content-Type": "application/apply-patch+yaml",
+            },
+            body=without_nulls(manifest),
+            auth_settings=["BearerToken"],
+            response_type="object",
+            _return_http_data_only=True,
+        )
+
+    def apply_all(
+        self, manifests: Iterable[Mapping[str, Any]]
+    ) -> List[Mapping[str, Any]]:
+        return [self.apply(manifest) for manifest in manifests]
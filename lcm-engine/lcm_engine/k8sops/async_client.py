@@ -0,0 +1,187 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from threading import Lock, Thread
+from typing import Any, Awaitable, Mapping
+
+from lcm_engine.k8sops.apply import (
+    FIELD_MANAGER,
+    resource_path_template,
+    without_nulls,
+)
+from lcm_engine.k8sops.k8sclient import (
+    CONNECT_TIMEOUT,
+    POOL_SIZE,
+    READ_TIMEOUT,
+    RETRIES,
+    RETRY_BACKOFF,
+    runtime_env,
+)
+from lcm_engine.metrics import K8S_REQUEST_SECONDS
+
+try:
+    from aiohttp import ClientConnectionError
+    from kubernetes_asyncio import client, config
+    from kubernetes_asyncio.client.rest import ApiException
+except ImportError:  # only needed for LCM_ENGINE_K8S_BACKEND=asyncio
+    client = config = None
+
+# sync: blocking kubernetes client calls from worker threads
+# asyncio: kubernetes_asyncio requests from a single event loop thread
+K8S_BACKEND = os.getenv("LCM_ENGINE_K8S_BACKEND", "sync").lower()
+
+
+class AsyncK8sClient:
+    """Submits rendered manifests with kubernetes_asyncio.
+
+    Every request runs on one event loop thread that owns a single
+    connection pool, so a pending request costs a coroutine instead of a
+    thread. Other threads hand over coroutines with ``run``.
+    """
+
+    def __init__(
+        self,
+        field_manager: str = FIELD_MANAGER,
+        force_conflicts: bool = True,
+    ):
+        self._field_manager = field_manager
+        self._force_conflicts = force_conflicts
+
+        self._lock = Lock()
+        self._loop = None
+        self._api_client = None
+
+    @property
+    def available(self) -> bool:
+        return client is not None
+
+    def run(self, coroutine: Awaitable) -> Any:
+        return asyncio.run_coroutine_threadsafe(
+            coroutine, self._event_loop()
+        ).result()
+
+    async def create(self, manifest: Mapping[str, Any]) -> Mapping[str, Any]:
+        path, path_params = resource_path_template(manifest)
+        del path_params["name"]
+
+        return await self._call(
+            path.rsplit("/", 1)[0],
+            "POST",
+            path_params=path_params,
+            header_params={
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+            },
+            body=without_nulls(manifest),
+        )
+
+    async def apply(self, manifest: Mapping[str, Any]) -> Mapping[str, Any]:
+        path, path_params = resource_path_template(manifest)
+
+        query_params = [("fieldManager", self._field_manager)]
+        if self._force_conflicts:
+            query_params.append(("force", "true"))
+
+        # bytes bodies are sent as they are, whatever the content type
+        return await self._call(
+            path,
+            "PATCH",
+            path_params=path_params,
+            query_params=query_params,
+            header_params={
+                "Accept": "application/json",
+                "Content-Type": "application/apply-patch+yaml",
+            },
+            body=json.dumps(without_nulls(manifest)).encode("utf-8"),
+        )
+
+    async def list(
+        self, path: str, label_selector: str = None
+    ) -> Mapping[str, Any]:
+        query_params = []
+        if label_selector:
+            query_params.append(("labelSelector", label_selector))
+
+        return await self._call(
+            path,
+            "GET",
+            query_params=query_params,
+            header_params={"Accept": "application/json"},
+        )
+
+    async def _call(self, path: str, method: str, **kwargs) -> Any:
+        api_client = await self._get_api_client()
+
+        for attempt in range(RETRIES + 1):
+            start = time.monotonic()
+            status = "ok"
+            try:
+                return await api_client.call_api(
+                    path,
+                    method,
+                    auth_settings=["BearerToken"],
+                    response_types_map={200: "object", 201: "object"},
+                    _return_http_data_only=True,
+                    _request_timeout=CONNECT_TIMEOUT + READ_TIMEOUT,
+                    **kwargs,
+                )
+            except ApiException as err:
+                status = str(err.status)
+                if err.status not in (429, 503) or attempt == RETRIES:
+                    raise
+            except (ClientConnectionError, asyncio.TimeoutError):
+                status = "error"
+                if attempt == RETRIES:
+                    raise
+            finally:
+                K8S_REQUEST_SECONDS.labels(method, path, status).observe(
+                    time.monotonic() - start
+                )
+
+            logging.warning(f"Retrying {method} {path} after {status}")
+            await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+    async def _get_api_client(self):
+        # created on the loop, since aiohttp sessions are bound to it
+        if self._api_client is None:
+            configuration = client.Configuration()
+            if runtime_env in ("k8s", "kubernetes"):
+                config.load_incluster_config(
+                    client_configuration=configuration
+                )
+            else:
+                await config.load_kube_config(
+                    config_file=os.getenv("LCM_ENGINE_KUBE_CONFIG_PATH"),
+                    context=os.getenv(
+                        "LCM_ENGINE_KUBE_CONFIG_CONTEXT", "default"
+                    ),
+                    client_configuration=configuration,
+                )
+            configuration.connection_pool_maxsize = POOL_SIZE
+
+            self._api_client = client.ApiClient(configuration)
+
+        return self._api_client
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        if not self.available:
+            raise RuntimeError(
+                "The asyncio k8s backend requires the kubernetes_asyncio "
+                "package"
+            )
+
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                Thread(
+                    target=self._loop.run_forever,
+                    name="lcm-k8s-loop",
+                    daemon=True,
+                ).start()
+
+        return self._loop
+
+
+async_k8s = AsyncK8sClient()
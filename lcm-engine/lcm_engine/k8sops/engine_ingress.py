@@ -0,0 +1,145 @@
+import logging
+import os
+import time
+from copy import deepcopy
+from threading import Lock
+from typing import Any, Mapping, Tuple, Union
+
+from kubernetes.client.models.v1_secret import V1Secret
+
+from lcm_engine.k8sops.k8sclient import k8s
+
+LCM_ENGINE_NAMESPACE = "lcm-engine"
+LCM_ENGINE_INGRESS_ROUTE = "lcm-engine"
+
+
+class EngineIngressCache:
+    """LCM Engine's ingress route, middlewares and secrets kept in memory.
+
+    The ingress route is re-read at most once per ``ttl`` seconds. Whenever
+    its resourceVersion changes, all cached middlewares and secrets are
+    dropped. Middlewares and secrets are re-read at least once per
+    ``max_age`` seconds even if the ingress route does not change.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        max_age: float,
+        namespace_name: str = LCM_ENGINE_NAMESPACE,
+        ingress_route_name: str = LCM_ENGINE_INGRESS_ROUTE,
+    ):
+        self._ttl = ttl
+        self._max_age = max_age
+        self._namespace_name = namespace_name
+        self._ingress_route_name = ingress_route_name
+
+        self._lock = Lock()
+        self._ingress_route = None
+        self._checked_at = 0.0
+        self._middlewares: Mapping[str, Tuple[float, Mapping[str, Any]]] = dict()
+        self._secrets: Mapping[str, Tuple[float, V1Secret]] = dict()
+
+    def invalidate(self):
+        with self._lock:
+            self._ingress_route = None
+            self._checked_at = 0.0
+            self._middlewares.clear()
+            self._secrets.clear()
+
+    def _resource_version(
+        self, obj: Union[Mapping[str, Any], None]
+    ) -> Union[str, None]:
+        if obj is None:
+            return None
+        return obj.get("metadata", dict()).get("resourceVersion")
+
+    def ingress_route(self) -> Mapping[str, Any]:
+        now = time.monotonic()
+
+        with self._lock:
+            if (
+                self._ingress_route is not None
+                and now - self._checked_at < self._ttl
+            ):
+                return deepcopy(self._ingress_route)
+
+        logging.info("Get IngressRoute for LCM Engine")
+
+        ingress_route = k8s.custom_v1.get_namespaced_custom_object(
+            group="traefik.containo.us",
+            version="v1alpha1",
+            namespace=self._namespace_name,
+            plural="ingressroutes",
+            name=self._ingress_route_name
+        )
+
+        with self._lock:
+            old_version = self._resource_version(self._ingress_route)
+            new_version = self._resource_version(ingress_route)
+            if old_version != new_version:
+                logging.info(
+                    "LCM Engine's ingress route changed "
+                    f"({old_version} -> {new_version})"
+                )
+                self._middlewares.clear()
+                self._secrets.clear()
+
+            self._ingress_route = ingress_route
+            self._checked_at = now
+
+            return deepcopy(ingress_route)
+
+    def middleware(self, middleware_name: str) -> Mapping[str, Any]:
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._middlewares.get(middleware_name)
+            if cached is not None and now - cached[0] < self._max_age:
+                return deepcopy(cached[1])
+
+        logging.info(
+            f"Get middleware {middleware_name} "
+            f"in namespace {self._namespace_name}"
+        )
+
+        middleware = k8s.custom_v1.get_namespaced_custom_object(
+            group="traefik.containo.us",
+            version="v1alpha1",
+            namespace=self._namespace_name,
+            plural="middlewares",
+            name=middleware_name
+        )
+
+        with self._lock:
+            self._middlewares[middleware_name] = (now, middleware)
+
+        return deepcopy(middleware)
+
+    def secret(self, secret_name: str) -> V1Secret:
+        now = time.monotonic()
+
+        with self._lock:
+            cached = self._secrets.get(secret_name)
+            if cached is not None and now - cached[0] < self._max_age:
+                return deepcopy(cached[1])
+
+        logging.debug(
+            f"Obtaining secret {secret_name} "
+            f"from namespace {self._namespace_name}"
+        )
+
+        secret = k8s.core_v1.read_namespaced_secret(
+            secret_name, namespace=self._namespace_name
+        )
+
+        with self._lock:
+            self._secrets[secret_name] = (now, secret)
+
+        return deepcopy(secret)
+
+
+engine_ingress_cache = EngineIngressCache(
+    ttl=float(os.getenv("LCM_ENGINE_INGRESS_CACHE_TTL", 60)),
+    max_age=float(os.getenv("LCM_ENGINE_INGRESS_CACHE_MAX_AGE", 600)),
+)
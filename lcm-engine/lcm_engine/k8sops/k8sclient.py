@@ -1,42 +1,152 @@
 import logging
 import os
-from pathlib import Path
+import socket
+import time
+from contextlib import contextmanager
+from threading import Lock
+from typing import Iterator
 
 from kubernetes import client, config
 from kubernetes.client.rest import ApiException
-from pythonping import ping
+from urllib3.connection import HTTPConnection
+from urllib3.util.retry import Retry
+
+from lcm_engine.metrics import K8S_REQUEST_SECONDS
 
 runtime_env = os.getenv("RUNTIME_ENVIRONMENT", "local").lower()
 
-if runtime_env in ("k8s", "kubernetes"):
-    config.load_incluster_config()
-else:
-    _default_kube_config_path = str(Path(__file__).parent.parent / Path("kube-config"))
-    kube_config = os.getenv("LCM_ENGINE_KUBE_CONFIG_PATH", _default_kube_config_path)
-    kube_context = os.getenv("LCM_ENGINE_KUBE_CONFIG_CONTEXT", "default")
+POOL_SIZE = int(os.getenv("LCM_ENGINE_K8S_POOL_SIZE", 32))
+CONNECT_TIMEOUT = float(os.getenv("LCM_ENGINE_K8S_CONNECT_TIMEOUT", 5))
+READ_TIMEOUT = float(os.getenv("LCM_ENGINE_K8S_READ_TIMEOUT", 30))
+RETRIES = int(os.getenv("LCM_ENGINE_K8S_RETRIES", 3))
+RETRY_BACKOFF = float(os.getenv("LCM_ENGINE_K8S_RETRY_BACKOFF", 0.5))
+
+
+def load_configuration() -> client.Configuration:
+    configuration = client.Configuration()
+
+    if runtime_env in ("k8s", "kubernetes"):
+        config.load_incluster_config(client_configuration=configuration)
+    else:
+        kube_config = os.getenv("LCM_ENGINE_KUBE_CONFIG_PATH")
+        kube_context = os.getenv("LCM_ENGINE_KUBE_CONFIG_CONTEXT", "default")
+        config.load_kube_config(
+            config_file=kube_config,
+            context=kube_context,
+            client_configuration=configuration,
+        )
+
+    # one pool per API server, shared by all threads
+    configuration.connection_pool_maxsize = POOL_SIZE
+    # only retry requests that could not have reached the API server, or
+    # the ones it explicitly refused, since creating resources is not
+    # idempotent
+    configuration.retries = Retry(
+        total=RETRIES,
+        connect=RETRIES,
+        read=0,
+        status=RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=(429, 503),
+        allowed_methods=None,
+        raise_on_status=False,
+        respect_retry_after_header=True,
+    )
+
+    return configuration
+
+
+class InstrumentedApiClient(client.ApiClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # keep idle pooled connections from being dropped silently
+        self.rest_client.pool_manager.connection_pool_kw["socket_options"] = (
+            HTTPConnection.default_socket_options
+            + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        )
+
+    # resource_path is still a template here, e.g.
+    # /api/v1/namespaces/{namespace}/pods, which keeps label values bounded
+    def call_api(self, resource_path, method, *args, **kwargs):
+        # watches stream their response and set their own timeout
+        if (
+            kwargs.get("_request_timeout") is None
+            and kwargs.get("_preload_content", True)
+        ):
+            kwargs["_request_timeout"] = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+        start = time.monotonic()
+        status = "ok"
+        try:
+            return super().call_api(resource_path, method, *args, **kwargs)
+        except ApiException as err:
+            status = str(err.status)
+            raise
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            K8S_REQUEST_SECONDS.labels(method, resource_path, status).observe(
+                time.monotonic() - start
+            )
+
 
-    config.load_kube_config(context=kube_context)
+class K8sClients:
+    """Kubernetes API clients, created on first use.
 
-core_v1 = client.CoreV1Api()
-apps_v1 = client.AppsV1Api()
-custom_v1 = client.CustomObjectsApi()
+    Loading the configuration is deferred until a client is needed, so
+    that importing LCM Engine does not require access to a cluster. All
+    API groups share a single connection pool.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._api_client = None
+
+    @property
+    def api_client(self) -> InstrumentedApiClient:
+        if self._api_client is None:
+            with self._lock:
+                if self._api_client is None:
+                    logging.info("Loading k8s configuration")
+                    self._api_client = InstrumentedApiClient(
+                        load_configuration()
+                    )
+        return self._api_client
+
+    @property
+    def core_v1(self) -> client.CoreV1Api:
+        return client.CoreV1Api(self.api_client)
+
+    @property
+    def apps_v1(self) -> client.AppsV1Api:
+        return client.AppsV1Api(self.api_client)
+
+    @property
+    def custom_v1(self) -> client.CustomObjectsApi:
+        return client.CustomObjectsApi(self.api_client)
+
+    @contextmanager
+    def exec_core_v1(self) -> Iterator[client.CoreV1Api]:
+        # exec streams swap out the request method of their API client, so
+        # each one gets a client of its own, closed when the stream is done
+        api_client = client.ApiClient(self.api_client.configuration)
+        try:
+            yield client.CoreV1Api(api_client)
+        finally:
+            api_client.close()
+            api_client.rest_client.pool_manager.clear()
+
+
+k8s = K8sClients()
 
 
 def check_connectivity() -> bool:
     logging.info("Checking connectivity with k8s")
     try:
-        core_v1.list_namespace(_request_timeout=3, limit=1)
+        k8s.core_v1.list_namespace(_request_timeout=3, limit=1)
         return True
     except ApiException as err:
         logging.error(f"Cannot list namespaces: {err}")
         return False
-
-
-def can_ping_pod(host: str) -> bool:
-    try:
-        responses = ping(host, count=1)
-        return len(responses) > 0
-    except PermissionError as err:
-        logging.error(f"Ping should be run as root: {err}")
-
-    return False
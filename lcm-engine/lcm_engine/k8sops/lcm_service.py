@@ -1,13 +1,18 @@
+import asyncio
 import logging
+import os
 from abc import ABC, abstractmethod
 from base64 import b64encode
 from io import BytesIO, StringIO
 from pathlib import Path
-from typing import Any, List, Mapping, Union
+from typing import Any, Callable, List, Mapping, Tuple, Union
 from zipfile import ZipFile
 import re
+import time
 
 import yaml
+from kubernetes import watch
+from kubernetes.stream import stream
 from kubernetes.client.models.v1_config_map import V1ConfigMap
 from kubernetes.client.models.v1_config_map_volume_source import \
     V1ConfigMapVolumeSource
@@ -32,20 +37,86 @@ from kubernetes.client.models.v1_secret_volume_source import \
 from kubernetes.client.models.v1_service import V1Service
 from kubernetes.client.models.v1_service_port import V1ServicePort
 from kubernetes.client.models.v1_service_spec import V1ServiceSpec
+from kubernetes.client.models.v1_status import V1Status
 from kubernetes.client.models.v1_volume import V1Volume
 from kubernetes.client.models.v1_volume_mount import V1VolumeMount
 from kubernetes.client.models.v1_local_object_reference import \
     V1LocalObjectReference
 from kubernetes.client.exceptions import ApiException
 
-from lcm_engine.k8sops.k8sclient import (
-    apps_v1, can_ping_pod, core_v1, custom_v1
-)
+from lcm_engine.deployment_package import DeploymentPackage
+from lcm_engine.k8sops.apply import ServerSideApplier
+from lcm_engine.k8sops.async_client import K8S_BACKEND, async_k8s
+from lcm_engine.k8sops.engine_ingress import engine_ingress_cache
+from lcm_engine.k8sops.k8sclient import READ_TIMEOUT, k8s
+from lcm_engine.k8sops.pod_cache import MANAGED_BY_LABELS, pod_cache
+from lcm_engine.k8sops.probe import probe_all
+from lcm_engine.k8sops.step_graph import StepGraph
+from lcm_engine.metrics import DEPLOY_SECONDS, DEPLOY_STEP_SECONDS
 from lcm_engine.k8sops.terraform import PATHS as TERRAFORM_PATHS
 from lcm_engine.k8sops.tosca import PATHS as TOSCA_PATHS
 from lcm_engine.k8sops.util import TPath, secret_key_name
 from lcm_engine.models.secret import Secret
 
+# create: typed create calls that fail on conflicts
+# server-side: idempotent server-side apply of the rendered manifests
+APPLY_MODE = os.getenv("LCM_ENGINE_APPLY_MODE", "create").lower()
+
+# label values cannot hold a SHA-256 hex digest
+PACKAGE_DIGEST_ANNOTATION = "lcm-engine/package-digest"
+# makes the API server leave out everything but the object metadata
+PARTIAL_OBJECT_METADATA = (
+    "application/json;as=PartialObjectMetadata;g=meta.k8s.io;v=v1"
+)
+
+# LCM Service deployments are named after their project kinds
+LCM_SERVICE_POD_SELECTOR = "app in (tosca,terraform)"
+
+BUSYBOX_IMAGE = "public.ecr.aws/docker/library/busybox"
+PACKAGE_LOADER_NAME = "package-loader"
+
+# kind of a pooled LCM Service, and whether it is idle or bound to a project
+WARM_POOL_LABEL = "lcm-engine/warm-pool"
+WARM_POOL_STATE_LABEL = "lcm-engine/warm-pool-state"
+WARM_POOL_PROJECT_ANNOTATION = "lcm-engine/project"
+
+
+class LCMServiceKind:
+    def __init__(
+        self,
+        name: str,
+        image: str,
+        working_dir: Path,
+        env: Mapping[str, str],
+        image_pull_secret_name: Union[str, None] = None,
+    ):
+        self.name = name
+        self.image = image
+        self.working_dir = working_dir
+        self.env = env
+        self.image_pull_secret_name = image_pull_secret_name
+
+    def __repr__(self):
+        return f"<LCMServiceKind {self.name} {self.image}>"
+
+
+# TODO: make this configurable
+LCM_SERVICE_KINDS = {
+    "tosca": LCMServiceKind(
+        "tosca",
+        "ghcr.io/xlab-si/xopera-api:0.5.4",
+        Path("/opera/csar"),
+        dict(PYTHONPATH="/app"),
+    ),
+    "terraform": LCMServiceKind(
+        "terraform",
+        "registry.gitlab.com/gaia-x/data-infrastructure-federation-services/orc/lcm-service/terraform-lcm-service-api:v0.2.1",
+        Path("/terraform-api"),
+        dict(),
+        image_pull_secret_name="docker-registry",
+    ),
+}
+
 
 def construct_namespace_name(workspace_id: int, project_id: int) -> str:
     logging.info(
@@ -64,13 +135,59 @@ def filter_by_has_attr(lst: List[Any], attr: str) -> List[Any]:
     ]
 
 
-def get_lcm_service_status_phase(workspace_id: int, project_id: int) -> str:
-    logging.info(
-        f"Get pod status for workspace ID {workspace_id} "
-        f"and project ID {project_id}"
+def get_lcm_service_status_phase(namespace_name: str) -> str:
+    logging.info(f"Get pod status in namespace {namespace_name}")
+
+    phase = pod_cache.phase(namespace_name)
+    if phase is not None:
+        return phase
+
+    # pods deployed before they were labelled are not in the cache
+    return k8s.core_v1.list_namespaced_pod(namespace_name).items[0].status.phase
+
+
+def get_lcm_service_status_phases(
+    namespace_names: List[str]
+) -> Mapping[str, Union[str, None]]:
+    logging.info(f"Get pod status for {len(namespace_names)} namespaces")
+
+    phases = {name: pod_cache.phase(name) for name in namespace_names}
+    missing = {name for name, phase in phases.items() if phase is None}
+    if not missing:
+        return phases
+
+    # one list for all pods the cache cannot answer for
+    for namespace_name, _, phase in sorted(
+        _list_lcm_service_pods(), key=lambda pod: pod[1]
+    ):
+        if namespace_name in missing and phases[namespace_name] is None:
+            phases[namespace_name] = phase
+
+    return phases
+
+
+def _list_lcm_service_pods() -> List[Tuple[str, str, Union[str, None]]]:
+    # (namespace name, pod name, phase) of all LCM Service pods
+    if K8S_BACKEND == "asyncio":
+        pod_list = async_k8s.run(
+            async_k8s.list("/api/v1/pods", LCM_SERVICE_POD_SELECTOR)
+        )
+        return [
+            (
+                pod["metadata"]["namespace"],
+                pod["metadata"]["name"],
+                pod.get("status", {}).get("phase"),
+            )
+            for pod in pod_list["items"]
+        ]
+
+    pod_list = k8s.core_v1.list_pod_for_all_namespaces(
+        label_selector=LCM_SERVICE_POD_SELECTOR
     )
-    namespace_name = construct_namespace_name(workspace_id, project_id)
-    return core_v1.list_namespaced_pod(namespace_name).items[0].status.phase
+    return [
+        (pod.metadata.namespace, pod.metadata.name, pod.status.phase)
+        for pod in pod_list.items
+    ]
 
 
 def get_hostname(
@@ -81,27 +198,130 @@ def get_hostname(
     return f"{service_name}.{namespace_name}.svc.{cluster_name}"
 
 
-def can_ping_lcm_service(namespace_name: str) -> bool:
-    hostname = get_hostname(namespace_name)
-    can_ping = can_ping_pod(hostname)
-    return can_ping
+def probe_lcm_services(
+    namespace_names: List[str], port: int = 8080, concurrency: int = 16
+) -> Mapping[str, str]:
+    if not namespace_names:
+        return dict()
 
+    hostnames = {name: get_hostname(name) for name in namespace_names}
+    logging.info(f"Probing {len(hostnames)} LCM Services")
+    connectivity = probe_all(hostnames.values(), port, concurrency)
+    return {
+        name: connectivity[hostname] for name, hostname in hostnames.items()
+    }
 
-def undeploy_lcm_service(workspace_id: int, project_id: int) -> V1Namespace:
-    namespace_name = construct_namespace_name(workspace_id, project_id)
+
+def undeploy_lcm_service(namespace_name: str) -> Union[V1Status, None]:
     msg = f"Deleting namespace {namespace_name} and all its resources"
     logging.info(msg)
-    return core_v1.delete_namespace(namespace_name)
+    try:
+        return k8s.core_v1.delete_namespace(namespace_name)
+    except ApiException as err:
+        if err.status != 404:
+            raise
+        logging.info(f"Namespace {namespace_name} is already gone")
+        return None
+
+
+def wait_for_namespace_deletion(namespace_name: str, timeout: float) -> bool:
+    """Wait until the namespace is finalized and gone.
+
+    Returns ``False`` if the namespace still exists after ``timeout``
+    seconds.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            namespace = k8s.core_v1.read_namespace(namespace_name)
+        except ApiException as err:
+            if err.status == 404:
+                return True
+            raise
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+
+        stream = watch.Watch().stream(
+            k8s.core_v1.list_namespace,
+            field_selector=f"metadata.name={namespace_name}",
+            resource_version=namespace.metadata.resource_version,
+            timeout_seconds=max(1, int(remaining)),
+        )
+        try:
+            for event in stream:
+                if event["type"] == "DELETED":
+                    return True
+        except ApiException as err:
+            # an expired resource version only needs a fresh read
+            if err.status != 410:
+                raise
+
+
+def upload_deployment_package(
+    namespace_name: str,
+    deployment_name: str,
+    working_dir: Path,
+    deployment_package: DeploymentPackage,
+    timeout: float = READ_TIMEOUT,
+):
+    """Extract the package into the working directory of a pooled pod.
+
+    The package is streamed to the package loader container, which shares
+    the working directory with the LCM Service container.
+    """
+    pod_list = k8s.core_v1.list_namespaced_pod(
+        namespace_name,
+        label_selector=f"app={deployment_name}",
+        field_selector="status.phase=Running",
+    )
+    if not pod_list.items:
+        raise ValueError(f"No running LCM Service in {namespace_name}")
+    pod_name = pod_list.items[0].metadata.name
+
+    logging.info(f"Uploading {deployment_package} to {pod_name}")
+    # stdin cannot be closed, so the loader reads exactly the package size
+    command = (
+        f"head -c {deployment_package.size} > /tmp/csar.zip && "
+        f"unzip -o -q /tmp/csar.zip -d '{working_dir}' && "
+        "rm /tmp/csar.zip"
+    )
+    with k8s.exec_core_v1() as exec_core_v1:
+        response = stream(
+            exec_core_v1.connect_get_namespaced_pod_exec,
+            pod_name,
+            namespace_name,
+            container=PACKAGE_LOADER_NAME,
+            command=["/bin/sh", "-c", command],
+            stdin=True,
+            stdout=True,
+            stderr=True,
+            tty=False,
+            _preload_content=False,
+        )
+        try:
+            for chunk in deployment_package.chunks():
+                response.write_stdin(chunk)
+            response.run_forever(timeout=timeout)
+
+            if response.returncode != 0:
+                raise ValueError(
+                    f"Cannot upload deployment package to {pod_name}: "
+                    f"{response.read_stderr() or 'timed out'}"
+                )
+        finally:
+            response.close()
 
 
 def create_debug_zip(namespace_name: str) -> BytesIO:
     try:
-        pod_list = core_v1.list_namespaced_pod(namespace_name)
+        pod_list = k8s.core_v1.list_namespaced_pod(namespace_name)
         pod = pod_list.items[0]
 
         pod_name = pod.metadata.name
 
-        log = core_v1.read_namespaced_pod_log(
+        log = k8s.core_v1.read_namespaced_pod_log(
             name=pod_name, namespace=namespace_name
         )
 
@@ -121,6 +341,9 @@ def create_debug_zip(namespace_name: str) -> BytesIO:
 
 
 class K8sResource(ABC):
+    api_version = None
+    kind = None
+
     def __init__(self):
         self._template = None
 
@@ -136,6 +359,31 @@ class K8sResource(ABC):
     def create(self):
         pass
 
+    def _render(self, template: Any) -> Mapping[str, Any]:
+        manifest = k8s.api_client.sanitize_for_serialization(template)
+        manifest.setdefault("apiVersion", self.api_version)
+        manifest.setdefault("kind", self.kind)
+
+        namespace_name = getattr(self, "_namespace_name", None)
+        if namespace_name:
+            manifest["metadata"].setdefault("namespace", namespace_name)
+
+        return manifest
+
+    def manifests(self) -> List[Mapping[str, Any]]:
+        if self._template is None:
+            return []
+
+        return [self._render(self._template)]
+
+    def is_applied(self) -> bool:
+        return False
+
+    def apply(self, applier: ServerSideApplier) -> List[Mapping[str, Any]]:
+        logging.info(f"Apply {self.kind}")
+
+        return applier.apply_all(self.manifests())
+
     def __str__(self):
         template = self._template
 
@@ -152,20 +400,23 @@ class K8sResource(ABC):
 
 
 class K8sNamespace(K8sResource):
-    def __init__(self, workspace_id: int, project_id: int):
-        super().__init__()
+    api_version = "v1"
+    kind = "Namespace"
 
-        self._workspace_id = workspace_id
-        self._project_id = project_id
+    def __init__(
+        self, namespace_name: str, labels: Union[Mapping[str, str], None] = None
+    ):
+        super().__init__()
 
-        self._name = construct_namespace_name(
-            workspace_id, project_id
-        )
+        self._name = namespace_name
+        self._labels = labels
 
     def build(self) -> V1Namespace:
         logging.info("Build namespace")
 
-        self._template = V1Namespace(metadata=V1ObjectMeta(name=self._name))
+        self._template = V1Namespace(
+            metadata=V1ObjectMeta(name=self._name, labels=self._labels)
+        )
 
         logging.debug(self)
 
@@ -174,37 +425,76 @@ class K8sNamespace(K8sResource):
     def create(self) -> V1Namespace:
         logging.info("Create namespace")
 
-        self._namespace = core_v1.create_namespace(self._template)
+        self._namespace = k8s.core_v1.create_namespace(self._template)
 
         return self._namespace
 
 
 class K8sConfigMap(K8sResource):
+    api_version = "v1"
+    kind = "ConfigMap"
+
     def __init__(
-        self, namespace_name: str, config_map_name: str, b64_csar: str
+        self,
+        namespace_name: str,
+        config_map_name: str,
+        deployment_package: DeploymentPackage,
     ):
         super().__init__()
 
         self._namespace_name = namespace_name
         self._config_map_name = config_map_name
-        self._b64_csar = b64_csar
+        self._deployment_package = deployment_package
 
     def build(self) -> V1ConfigMap:
         logging.info("Build config map")
 
         self._template = V1ConfigMap(
-            metadata=V1ObjectMeta(name=self._config_map_name),
-            binary_data={"csar.zip": self._b64_csar},
+            metadata=V1ObjectMeta(
+                name=self._config_map_name,
+                annotations={
+                    PACKAGE_DIGEST_ANNOTATION: self._deployment_package.digest
+                },
+            ),
+            binary_data={
+                "csar.zip": self._deployment_package.b64encode()
+            },
         )
 
         logging.debug(self)
 
         return self._template
 
+    def is_applied(self) -> bool:
+        # the config map itself holds the whole CSAR
+        try:
+            config_map = k8s.api_client.call_api(
+                "/api/v1/namespaces/{namespace}/configmaps/{name}",
+                "GET",
+                path_params=dict(
+                    namespace=self._namespace_name,
+                    name=self._config_map_name,
+                ),
+                header_params={"Accept": PARTIAL_OBJECT_METADATA},
+                auth_settings=["BearerToken"],
+                response_type="object",
+                _return_http_data_only=True,
+            )
+        except ApiException as err:
+            if err.status == 404:
+                return False
+            raise
+
+        annotations = config_map["metadata"].get("annotations") or dict()
+        return (
+            annotations.get(PACKAGE_DIGEST_ANNOTATION)
+            == self._deployment_package.digest
+        )
+
     def create(self) -> V1ConfigMap:
         logging.info("Create config map")
 
-        self._config_map = core_v1.create_namespaced_config_map(
+        self._config_map = k8s.core_v1.create_namespaced_config_map(
             self._namespace_name, self._template
         )
 
@@ -212,6 +502,9 @@ class K8sConfigMap(K8sResource):
 
 
 class K8sService(K8sResource):
+    api_version = "v1"
+    kind = "Service"
+
     def __init__(
         self,
         namespace_name: str,
@@ -254,7 +547,7 @@ class K8sService(K8sResource):
     def create(self) -> V1Service:
         logging.info("Create service")
 
-        self._service = core_v1.create_namespaced_service(
+        self._service = k8s.core_v1.create_namespaced_service(
             self._namespace_name, self._template
         )
 
@@ -262,6 +555,9 @@ class K8sService(K8sResource):
 
 
 class K8sDeployment(K8sResource):
+    api_version = "apps/v1"
+    kind = "Deployment"
+
     def __init__(
         self,
         namespace_name: str,
@@ -276,6 +572,7 @@ class K8sDeployment(K8sResource):
         env_secret_name: str,
 
         image_pull_secret_name: Union[str, None],
+        package_loader: bool = False,
     ):
         super().__init__()
 
@@ -293,6 +590,7 @@ class K8sDeployment(K8sResource):
         self._app_label = dict(app=self._deployment_name)
 
         self._image_pull_secret_name = image_pull_secret_name
+        self._package_loader = package_loader
 
     @property
     def app_label(self) -> str:
@@ -309,6 +607,7 @@ class K8sDeployment(K8sResource):
             self._secrets,
             self._env_secret_name,
             self._image_pull_secret_name,
+            package_loader=self._package_loader,
         ).build()
 
     def build(self) -> V1Deployment:
@@ -321,7 +620,9 @@ class K8sDeployment(K8sResource):
             spec=V1DeploymentSpec(
                 selector=V1LabelSelector(match_labels=self._app_label),
                 template=V1PodTemplateSpec(
-                    metadata=V1ObjectMeta(labels=self._app_label),
+                    metadata=V1ObjectMeta(
+                        labels={**self._app_label, **MANAGED_BY_LABELS}
+                    ),
                     spec=self._build_pod()
                 ),
             ),
@@ -334,13 +635,16 @@ class K8sDeployment(K8sResource):
     def create(self) -> V1Deployment:
         logging.info("Create deployment")
 
-        self._deployment = apps_v1.create_namespaced_deployment(
+        self._deployment = k8s.apps_v1.create_namespaced_deployment(
             self._namespace_name, self._template
         )
         return self._deployment
 
 
 class K8sSecret(K8sResource):
+    api_version = "v1"
+    kind = "Secret"
+
     def __init__(
         self, namespace_name: str, secret_name: str, secrets: List[Secret]
     ):
@@ -372,7 +676,7 @@ class K8sSecret(K8sResource):
     def create(self) -> V1Secret:
         logging.info("Create secret")
 
-        self._secret = core_v1.create_namespaced_secret(
+        self._secret = k8s.core_v1.create_namespaced_secret(
             self._namespace_name, self._template
         )
 
@@ -429,6 +733,9 @@ class K8sEnvSecret(K8sSecret):
 
 
 class K8sImagePullSecret(K8sResource):
+    api_version = "v1"
+    kind = "Secret"
+
     def __init__(
         self,
         namespace_name: str,
@@ -441,10 +748,7 @@ class K8sImagePullSecret(K8sResource):
 
     def _get_secret(self):
         # Get secret from the lcm-engine namespace
-        secret = core_v1.read_namespaced_secret(
-            self._secret_name, "lcm-engine"
-        )
-        return secret
+        return engine_ingress_cache.secret(self._secret_name)
 
     def build(self) -> V1Secret:
         logging.info("Build image pull secret")
@@ -467,7 +771,7 @@ class K8sImagePullSecret(K8sResource):
     def create(self) -> V1Secret:
         logging.info("Create image pull secret")
 
-        secret = core_v1.create_namespaced_secret(
+        secret = k8s.core_v1.create_namespaced_secret(
             self._namespace_name, self._template
         )
 
@@ -486,6 +790,7 @@ class K8sPodSpec(K8sResource):
         secrets: List[Secret],
         env_secret_name: str,
         image_pull_secret_name: Union[str, None],
+        package_loader: bool = False,
     ):
         self.file_secret_name = file_secret_name
         self.deployment_name = deployment_name
@@ -497,20 +802,23 @@ class K8sPodSpec(K8sResource):
         self.secrets = secrets
         self.env_secret_name = env_secret_name
         self.image_pull_secret_name = image_pull_secret_name
+        # pooled LCM Services get their package uploaded once bound
+        self.package_loader = package_loader
 
     def _define_volumes(self) -> List[V1Volume]:
         volumes = [
-            V1Volume(
-                name="compressed-deployment-package",
-                config_map=V1ConfigMapVolumeSource(
-                    name=self.config_map_name
-                )
-            ),
             V1Volume(
                 name="extracted-deployment-package",
                 empty_dir=V1EmptyDirVolumeSource()
             )
         ]
+        if not self.package_loader:
+            volumes.insert(0, V1Volume(
+                name="compressed-deployment-package",
+                config_map=V1ConfigMapVolumeSource(
+                    name=self.config_map_name
+                )
+            ))
 
         visited = set()
         for secret in self.secrets:
@@ -549,13 +857,19 @@ class K8sPodSpec(K8sResource):
                     self.env_secret_name
                 ).build()
             ],
-            init_containers=[
+            volumes=self._define_volumes()
+        )
+
+        if self.package_loader:
+            pod_spec.containers.append(
+                K8sPackageLoaderContainer(self.working_dir).build()
+            )
+        else:
+            pod_spec.init_containers = [
                 K8sLCMServiceInitContainer(
                     self.working_dir
                 ).build()
-            ],
-            volumes=self._define_volumes()
-        )
+            ]
 
         if self.image_pull_secret_name:
             pod_spec.image_pull_secrets = [
@@ -648,7 +962,7 @@ class K8sLCMServiceInitContainer(K8sResource):
     def __init__(
         self,
         extracted_deployment_package_mount_path: Path,
-        image: str = "public.ecr.aws/docker/library/busybox"
+        image: str = BUSYBOX_IMAGE
     ):
         self.extracted_deployment_package_mount_path = extracted_deployment_package_mount_path
         self.image = image
@@ -682,7 +996,44 @@ class K8sLCMServiceInitContainer(K8sResource):
         pass
 
 
+class K8sPackageLoaderContainer(K8sResource):
+    def __init__(
+        self,
+        extracted_deployment_package_mount_path: Path,
+        image: str = BUSYBOX_IMAGE
+    ):
+        self.extracted_deployment_package_mount_path = extracted_deployment_package_mount_path
+        self.image = image
+
+    def build(self) -> V1Container:
+        # idles until upload_deployment_package() execs into it
+        return V1Container(
+            name=PACKAGE_LOADER_NAME,
+            image=self.image,
+            command=["/bin/sh"],
+            args=[
+                "-c",
+                "trap 'exit 0' TERM; "
+                "while true; do sleep 3600 & wait $!; done"
+            ],
+            volume_mounts=[
+                V1VolumeMount(
+                    name="extracted-deployment-package",
+                    mount_path=self.extracted_deployment_package_mount_path.as_posix(),
+                    sub_path=self.extracted_deployment_package_mount_path.name,
+                    read_only=False
+                )
+            ]
+        )
+
+    def create(self):
+        pass
+
+
 class K8sMiddleware(K8sResource):
+    api_version = "traefik.containo.us/v1alpha1"
+    kind = "Middleware"
+
     def __init__(
         self,
         namespace_name: str,
@@ -722,7 +1073,7 @@ class K8sMiddleware(K8sResource):
     def create(self) -> Mapping[str, Any]:
         logging.info("Create Middleware")
 
-        middleware = custom_v1.create_namespaced_custom_object(
+        middleware = k8s.custom_v1.create_namespaced_custom_object(
             group="traefik.containo.us",
             version="v1alpha1",
             namespace=self._namespace_name,
@@ -734,6 +1085,9 @@ class K8sMiddleware(K8sResource):
 
 
 class K8sIngressRoute(K8sResource):
+    api_version = "traefik.containo.us/v1alpha1"
+    kind = "IngressRoute"
+
     def __init__(
         self,
         namespace_name: str,
@@ -762,10 +1116,32 @@ class K8sIngressRoute(K8sResource):
         self._priority = priority
         self._hostname = hostname
 
+        # copies of the LCM Engine's middlewares and their secrets
+        self._middleware_templates = []
+        self._secret_templates = []
+
     def create(self) -> Mapping[str, Any]:
+        for secret in self._secret_templates:
+            logging.debug(
+                f"Creating secret {secret.metadata.name} "
+                f"in namespace {self._namespace_name}"
+            )
+            k8s.core_v1.create_namespaced_secret(
+                namespace=self._namespace_name, body=secret
+            )
+
+        for middleware in self._middleware_templates:
+            k8s.custom_v1.create_namespaced_custom_object(
+                group="traefik.containo.us",
+                version="v1alpha1",
+                namespace=self._namespace_name,
+                plural="middlewares",
+                body=middleware,
+            )
+
         logging.info("Create IngressRoute")
 
-        ingress_route = custom_v1.create_namespaced_custom_object(
+        ingress_route = k8s.custom_v1.create_namespaced_custom_object(
             group="traefik.containo.us",
             version="v1alpha1",
             namespace=self._namespace_name,
@@ -776,17 +1152,7 @@ class K8sIngressRoute(K8sResource):
         return ingress_route
 
     def get_for_lcm_engine(self) -> Mapping[str, Any]:
-        logging.info("Get IngressRoute for LCM Engine")
-
-        ingress_route = custom_v1.get_namespaced_custom_object(
-            group="traefik.containo.us",
-            version="v1alpha1",
-            namespace="lcm-engine",
-            plural="ingressroutes",
-            name="lcm-engine"
-        )
-
-        return ingress_route
+        return engine_ingress_cache.ingress_route()
 
     def _get_hostname(self, ingress_route: Mapping[str, Any]) -> str:
         hostname = self._hostname
@@ -814,21 +1180,11 @@ class K8sIngressRoute(K8sResource):
 
         return ingress_route
 
-    def _get_middleware(self, middleware_name: str, namespace_name="lcm-engine") -> Mapping[str, Any]:
-        logging.info(f"Get middleware {middleware_name} in namespace {namespace_name}")
-
-        middleware = custom_v1.get_namespaced_custom_object(
-            group="traefik.containo.us",
-            version="v1alpha1",
-            namespace=namespace_name,
-            plural="middlewares",
-            name=middleware_name
-        )
+    def _get_middleware(self, middleware_name: str) -> Mapping[str, Any]:
+        return engine_ingress_cache.middleware(middleware_name)
 
-        return middleware
-
-    def _create_middleware(self, name: str, spec: Mapping[str, Any]) -> Mapping[str, Any]:
-        body = dict(
+    def _build_middleware(self, name: str, spec: Mapping[str, Any]) -> Mapping[str, Any]:
+        return dict(
             apiVersion="traefik.containo.us/v1alpha1",
             kind="Middleware",
             metadata=V1ObjectMeta(
@@ -837,45 +1193,30 @@ class K8sIngressRoute(K8sResource):
             spec=spec
         )
 
-        middleware = custom_v1.create_namespaced_custom_object(
-            group="traefik.containo.us",
-            version="v1alpha1",
-            namespace=self._namespace_name,
-            plural="middlewares",
-            body=body,
-        )
-
-        return middleware
-
-    def _create_secret(self, secret: V1Secret):
-        logging.debug(
-            f"Creating secret {secret.metadata.name} in namespace {self._namespace_name}"
-        )
-        secret = V1Secret(
+    def _build_secret(self, secret: V1Secret) -> V1Secret:
+        return V1Secret(
+            api_version="v1",
+            kind="Secret",
             metadata=V1ObjectMeta(
                 name=secret.metadata.name, namespace=self._namespace_name
             ), data=secret.data
         )
-        return core_v1.create_namespaced_secret(
-            namespace=self._namespace_name, body=secret
-        )
 
-    def _get_secret(self, secret_name: str, namespace="lcm-engine") -> V1Secret:
-        logging.debug(f"Obtaining secret {secret_name} from namespace {namespace}")
-        return core_v1.read_namespaced_secret(secret_name, namespace=namespace)
+    def _get_secret(self, secret_name: str) -> V1Secret:
+        return engine_ingress_cache.secret(secret_name)
 
     def _extract_secret(self, middleware_name: str, middleware: Mapping[str, Any]):
         try:
             secret_name = middleware["spec"]["basicAuth"]["secret"]
             secret = self._get_secret(secret_name)
-            self._create_secret(secret)
+            self._secret_templates.append(self._build_secret(secret))
         except KeyError as err:
             logging.debug(
                 "Attempted to extract basicAuth secret name from "
                 f"middleware {middleware_name}: {err}"
             )
         except ApiException as err:
-            logging.error(f"Cannot obtain or create secret {secret_name}: {err}")
+            logging.error(f"Cannot obtain secret {secret_name}: {err}")
 
     def _assign_middlewares(self, ingress_route: Mapping[str, Any]) -> List[Mapping[str, str]]:
         try:
@@ -886,7 +1227,9 @@ class K8sIngressRoute(K8sResource):
                 name = middleware["name"]
                 middleware = self._get_middleware(name)
                 self._extract_secret(name, middleware)
-                self._create_middleware(name, middleware["spec"])
+                self._middleware_templates.append(
+                    self._build_middleware(name, middleware["spec"])
+                )
 
                 mids.append(dict(name=name))
 
@@ -897,7 +1240,7 @@ class K8sIngressRoute(K8sResource):
             logging.debug(str(err))
             middlewares = []
         except ApiException as err:
-            logging.error(f"Cannot obtain or create middleware: {err}")
+            logging.error(f"Cannot obtain middleware: {err}")
             middlewares = []
 
         middlewares.append(dict(name=self._middleware_name))
@@ -958,9 +1301,24 @@ class K8sIngressRoute(K8sResource):
 
         return entry_points
 
+    def manifests(self) -> List[Mapping[str, Any]]:
+        if self._template is None:
+            return []
+
+        return [
+            self._render(template) for template in (
+                self._secret_templates
+                + self._middleware_templates
+                + [self._template]
+            )
+        ]
+
     def build(self) -> Mapping[str, Any]:
         logging.info("Build ingress route")
 
+        self._middleware_templates = []
+        self._secret_templates = []
+
         ingress_route = self._get_ingress_route()
         hostname = self._get_hostname(ingress_route)
         middlewares = self._assign_middlewares(ingress_route)
@@ -1001,7 +1359,7 @@ class LCMServiceDeployer:
         working_dir: Path,
         env: Mapping[str, str],
 
-        b64_deployment_package: str,
+        deployment_package: DeploymentPackage,
 
         secrets: List[Secret] = [],
 
@@ -1009,12 +1367,18 @@ class LCMServiceDeployer:
         certificate_secret_name: Union[str, None] = None,
 
         image_pull_secret_name: Union[str, None] = None,
+
+        server_side_apply: bool = APPLY_MODE == "server-side",
+        backend: str = K8S_BACKEND,
+
+        namespace_name: Union[str, None] = None,
     ):
         self._workspace_id = workspace_id
         self._project_id = project_id
-        self._namespace_name = construct_namespace_name(
+        self._namespace_name = namespace_name or construct_namespace_name(
             workspace_id, project_id
         )
+        self._namespace_labels = None
 
         self._deployment_name = deployment_name
         self._config_map_name = deployment_name
@@ -1034,7 +1398,7 @@ class LCMServiceDeployer:
         self._working_dir = working_dir
         self._env = env
 
-        self._b64_deployment_package = b64_deployment_package
+        self._deployment_package = deployment_package
         self._secrets = secrets
         self._file_secrets = filter_by_has_attr(secrets, "file")
         self._env_secrets = filter_by_has_attr(secrets, "env")
@@ -1046,45 +1410,169 @@ class LCMServiceDeployer:
         self._certificate_secret_name = certificate_secret_name
 
         self._image_pull_secret_name = image_pull_secret_name
+        self._package_loader = False
+
+        self._step_timings = dict()
+
+        self._backend = backend
+        self._server_side_apply = server_side_apply
+        # the asyncio backend applies manifests itself
+        self._applier = None
+        if server_side_apply and backend != "asyncio":
+            self._applier = ServerSideApplier()
 
     @property
     def namespace_name(self):
         return self._namespace_name
 
-    def deploy(self):
-        logging.info("Deploying on k8s")
-
-        self._create_namespace()
-        self._create_config_map()
+    @property
+    def step_timings(self) -> Mapping[str, float]:
+        return self._step_timings
+
+    def _build_step_graph(
+        self, submit: Callable[[Callable[[], List[K8sResource]]], Any]
+    ) -> StepGraph:
+        # resources are only constructed once their step runs, since the
+        # deployment refers to the names of the secrets
+        graph = StepGraph()
+
+        graph.add("namespace", lambda: submit(self._namespace_resources))
+
+        deployment_dependencies = ["config map"]
+        graph.add(
+            "config map",
+            lambda: submit(self._config_map_resources),
+            ["namespace"],
+        )
         if self._secrets:
-            self._create_secrets()
+            graph.add(
+                "secrets",
+                lambda: submit(self._secret_resources),
+                ["namespace"],
+            )
+            deployment_dependencies.append("secrets")
         if self._image_pull_secret_name:
-            self._create_image_pull_secret()
-        self._create_deployment()
-        self._create_service()
-        self._create_middleware()
-        self._create_ingress_route()
-
-    def _create_namespace(self):
-        ns = K8sNamespace(
-            self._workspace_id,
-            self._project_id
+            graph.add(
+                "image pull secret",
+                lambda: submit(self._image_pull_secret_resources),
+                ["namespace"]
+            )
+            deployment_dependencies.append("image pull secret")
+
+        graph.add(
+            "deployment",
+            lambda: submit(self._deployment_resources),
+            deployment_dependencies,
+        )
+        graph.add(
+            "service", lambda: submit(self._service_resources), ["namespace"]
+        )
+        graph.add(
+            "middleware",
+            lambda: submit(self._middleware_resources),
+            ["namespace"],
+        )
+        graph.add(
+            "ingress route",
+            lambda: submit(self._ingress_route_resources),
+            ["namespace"],
         )
 
-        ns.build()
-        ns.create()
+        return graph
 
-    def _create_config_map(self):
-        cm = K8sConfigMap(
-            self._namespace_name,
-            self._config_map_name,
-            self._b64_deployment_package
+    def deploy(self, on_step: Union[Callable[[str], None], None] = None):
+        logging.info("Deploying on k8s")
+
+        start = time.monotonic()
+        try:
+            if self._backend == "asyncio":
+                graph = self._build_step_graph(self._submit_all_async)
+                self._step_timings = async_k8s.run(
+                    graph.run_async(on_step=on_step)
+                )
+            else:
+                graph = self._build_step_graph(self._submit_all)
+                self._step_timings = graph.run(on_step=on_step)
+        except Exception:
+            DEPLOY_SECONDS.labels("failed").observe(time.monotonic() - start)
+            raise
+
+        DEPLOY_SECONDS.labels("deployed").observe(time.monotonic() - start)
+        for name, duration in self._step_timings.items():
+            DEPLOY_STEP_SECONDS.labels(name).observe(duration)
+
+        logging.info(
+            f"Deployed {self._namespace_name} in "
+            f"{time.monotonic() - start:.3f} s: "
+            + ", ".join(
+                f"{name} {duration:.3f} s"
+                for name, duration in self._step_timings.items()
+            )
         )
 
-        cm.build()
-        cm.create()
+    def close(self):
+        if self._deployment_package is not None:
+            self._deployment_package.close()
+
+    def _blocking(self, step: Callable[[], Any]) -> Callable[[], Any]:
+        # steps that do not go through submit, for either backend
+        if self._backend != "asyncio":
+            return step
+        return lambda: asyncio.get_running_loop().run_in_executor(None, step)
+
+    def _submit(self, resource: K8sResource):
+        if self._applier is not None and resource.is_applied():
+            logging.info(f"{resource.kind} is already up to date")
+            return
+
+        resource.build()
+
+        if self._applier is not None:
+            resource.apply(self._applier)
+        else:
+            resource.create()
+
+    def _submit_all(self, resources: Callable[[], List[K8sResource]]):
+        for resource in resources():
+            self._submit(resource)
+
+    async def _submit_all_async(
+        self, resources: Callable[[], List[K8sResource]]
+    ):
+        loop = asyncio.get_running_loop()
+
+        for resource in resources():
+            # building may read from k8s or encode large packages
+            if self._server_side_apply and await loop.run_in_executor(
+                None, resource.is_applied
+            ):
+                logging.info(f"{resource.kind} is already up to date")
+                continue
+
+            await loop.run_in_executor(None, resource.build)
+
+            logging.info(f"Submit {resource.kind}")
+            for manifest in resource.manifests():
+                if self._server_side_apply:
+                    await async_k8s.apply(manifest)
+                else:
+                    await async_k8s.create(manifest)
+
+    def _namespace_resources(self) -> List[K8sResource]:
+        return [K8sNamespace(self._namespace_name, self._namespace_labels)]
+
+    def _config_map_resources(self) -> List[K8sResource]:
+        return [
+            K8sConfigMap(
+                self._namespace_name,
+                self._config_map_name,
+                self._deployment_package
+            )
+        ]
+
+    def _secret_resources(self) -> List[K8sResource]:
+        resources = []
 
-    def _create_secrets(self):
         if self._env_secrets:
             env_secret = K8sEnvSecret(
                 self._namespace_name,
@@ -1094,8 +1582,7 @@ class LCMServiceDeployer:
 
             self._env_secret_name = env_secret._secret_name
 
-            env_secret.build()
-            env_secret.create()
+            resources.append(env_secret)
 
         if self._file_secrets:
             file_secret = K8sFileSecret(
@@ -1106,70 +1593,178 @@ class LCMServiceDeployer:
 
             self._file_secret_name = file_secret._secret_name
 
-            file_secret.build()
-            file_secret.create()
+            resources.append(file_secret)
 
-    def _create_image_pull_secret(self):
-        ips = K8sImagePullSecret(
-            self._namespace_name,
-            self._image_pull_secret_name
-        )
+        return resources
 
-        ips.build()
-        ips.create()
+    def _image_pull_secret_resources(self) -> List[K8sResource]:
+        return [
+            K8sImagePullSecret(
+                self._namespace_name,
+                self._image_pull_secret_name
+            )
+        ]
 
-    def _create_deployment(self):
-        d = K8sDeployment(
-            self._namespace_name,
-            self._deployment_name,
+    def _deployment_resources(self) -> List[K8sResource]:
+        return [
+            K8sDeployment(
+                self._namespace_name,
+                self._deployment_name,
+
+                self._file_secret_name,
+                self._container_image,
+                self._working_dir,
+                self._container_port,
+                self._env,
+                self._secrets,
+                self._env_secret_name,
+                self._image_pull_secret_name,
+                package_loader=self._package_loader,
+            )
+        ]
 
-            self._file_secret_name,
-            self._container_image,
-            self._working_dir,
-            self._container_port,
-            self._env,
-            self._secrets,
-            self._env_secret_name,
-            self._image_pull_secret_name,
+    def _service_resources(self) -> List[K8sResource]:
+        return [
+            K8sService(
+                self._namespace_name,
+                self._service_name,
+                port=self._container_port
+            )
+        ]
+
+    def _middleware_resources(self) -> List[K8sResource]:
+        return [
+            K8sMiddleware(
+                self._namespace_name,
+                self._middleware_name,
+                self._workspace_id,
+                self._project_id
+            )
+        ]
+
+    def _ingress_route_resources(self) -> List[K8sResource]:
+        return [
+            K8sIngressRoute(
+                self._namespace_name,
+                self._ingress_route_name,
+                self._paths,
+                self._workspace_id,
+                self._project_id,
+                self._service_name,
+                self._middleware_name,
+                port=self._container_port,
+                hostname=self._hostname,
+                certificate_secret_name=self._certificate_secret_name
+            )
+        ]
+
+
+class WarmLCMServiceDeployer(LCMServiceDeployer):
+    """Deploys an idle LCM Service for the warm pool.
+
+    The LCM Service runs without a deployment package and without routes,
+    next to a package loader, until LCMServiceBinder binds it to a project.
+    """
+
+    def __init__(
+        self,
+        namespace_name: str,
+        kind: LCMServiceKind,
+        container_port: int = 8080,
+        **kwargs,
+    ):
+        super().__init__(
+            None,
+            None,
+            kind.name,
+            kind.image,
+            container_port,
+            kind.working_dir,
+            kind.env,
+            None,
+            image_pull_secret_name=kind.image_pull_secret_name,
+            namespace_name=namespace_name,
+            **kwargs,
         )
 
-        d.build()
-        d.create()
+        self._namespace_labels = {
+            WARM_POOL_LABEL: kind.name,
+            WARM_POOL_STATE_LABEL: "idle",
+        }
+        self._package_loader = True
 
-    def _create_service(self):
-        svc = K8sService(
-            self._namespace_name,
-            self._service_name,
-            port=self._container_port
+    def _build_step_graph(
+        self, submit: Callable[[Callable[[], List[K8sResource]]], Any]
+    ) -> StepGraph:
+        graph = StepGraph()
+
+        graph.add("namespace", lambda: submit(self._namespace_resources))
+
+        deployment_dependencies = ["namespace"]
+        if self._image_pull_secret_name:
+            graph.add(
+                "image pull secret",
+                lambda: submit(self._image_pull_secret_resources),
+                ["namespace"]
+            )
+            deployment_dependencies.append("image pull secret")
+
+        graph.add(
+            "deployment",
+            lambda: submit(self._deployment_resources),
+            deployment_dependencies,
+        )
+        graph.add(
+            "service", lambda: submit(self._service_resources), ["namespace"]
         )
 
-        svc.build()
-        svc.create()
+        return graph
 
-    def _create_middleware(self):
-        mw = K8sMiddleware(
-            self._namespace_name,
-            self._middleware_name,
-            self._workspace_id,
-            self._project_id
+
+class LCMServiceBinder(LCMServiceDeployer):
+    """Binds a project to an idle LCM Service from the warm pool.
+
+    The LCM Service already runs, so binding only claims its namespace,
+    uploads the deployment package into its working directory and routes
+    the project's paths to it.
+    """
+
+    def _build_step_graph(
+        self, submit: Callable[[Callable[[], List[K8sResource]]], Any]
+    ) -> StepGraph:
+        graph = StepGraph()
+
+        graph.add("claim", self._blocking(self._claim))
+        graph.add("package", self._blocking(self._upload_package), ["claim"])
+        graph.add(
+            "middleware",
+            lambda: submit(self._middleware_resources),
+            ["claim"],
+        )
+        graph.add(
+            "ingress route",
+            lambda: submit(self._ingress_route_resources),
+            ["claim"],
         )
 
-        mw.build()
-        mw.create()
+        return graph
 
-    def _create_ingress_route(self):
-        ir = K8sIngressRoute(
+    def _claim(self):
+        k8s.core_v1.patch_namespace(
             self._namespace_name,
-            self._ingress_route_name,
-            self._paths,
-            self._workspace_id,
-            self._project_id,
-            self._service_name,
-            self._middleware_name,
-            port=self._container_port,
-            hostname=self._hostname,
-            certificate_secret_name=self._certificate_secret_name
+            dict(metadata=dict(
+                labels={WARM_POOL_STATE_LABEL: "bound"},
+                annotations={
+                    WARM_POOL_PROJECT_ANNOTATION:
+                        f"{self._workspace_id}/{self._project_id}"
+                },
+            )),
         )
 
-        ir.build()
-        ir.create()
+    def _upload_package(self):
+        upload_deployment_package(
+            self._namespace_name,
+            self._deployment_name,
+            self._working_dir,
+            self._deployment_package,
+        )
@@ -0,0 +1,163 @@
+import logging
+import os
+import time
+from threading import Event, Lock, Thread
+from typing import Mapping, Union
+
+from kubernetes import watch
+from kubernetes.client.exceptions import ApiException
+from kubernetes.client.models.v1_pod import V1Pod
+
+from lcm_engine.k8sops.k8sclient import k8s
+
+MANAGED_BY_LABELS = {"app.kubernetes.io/managed-by": "lcm-engine"}
+
+
+def label_selector(labels: Mapping[str, str]) -> str:
+    return ",".join(f"{key}={value}" for key, value in labels.items())
+
+
+class PodPhaseCache:
+    """Phases of LCM Service pods, kept up to date by a single watch.
+
+    Pods are listed once across all namespaces and then watched for
+    changes, so lookups never reach the Kubernetes API. The cache only
+    answers while the watch is in sync.
+    """
+
+    def __init__(
+        self,
+        labels: Mapping[str, str] = MANAGED_BY_LABELS,
+        resync_period: int = 300,
+        retry_delay: float = 5.0,
+    ):
+        self._label_selector = label_selector(labels)
+        self._resync_period = resync_period
+        self._retry_delay = retry_delay
+
+        self._lock = Lock()
+        # namespace name: {pod name: phase}
+        self._phases: Mapping[str, Mapping[str, str]] = dict()
+        self._synced = Event()
+        self._stopped = Event()
+        self._thread = None
+
+    @property
+    def synced(self) -> bool:
+        return self._synced.is_set()
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        logging.info(f"Watching pods with labels {self._label_selector}")
+        self._stopped.clear()
+        self._thread = Thread(
+            target=self._run, name="lcm-pod-cache", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._synced.clear()
+
+    def phase(self, namespace_name: str) -> Union[str, None]:
+        """Return the phase of a pod in the namespace.
+
+        ``None`` means that the cache cannot tell, either because it is
+        not in sync or because no labelled pod runs in the namespace.
+        """
+        if not self.synced:
+            return None
+
+        with self._lock:
+            pods = self._phases.get(namespace_name)
+            if not pods:
+                return None
+            # same pod as the first item of a namespaced pod list
+            return pods[min(pods)]
+
+    def _set(self, pod: V1Pod):
+        namespace_name = pod.metadata.namespace
+        with self._lock:
+            pods = self._phases.setdefault(namespace_name, dict())
+            pods[pod.metadata.name] = pod.status.phase if pod.status else None
+
+    def _delete(self, pod: V1Pod):
+        namespace_name = pod.metadata.namespace
+        with self._lock:
+            pods = self._phases.get(namespace_name, dict())
+            pods.pop(pod.metadata.name, None)
+            if not pods:
+                self._phases.pop(namespace_name, None)
+
+    def _list(self) -> str:
+        pod_list = k8s.core_v1.list_pod_for_all_namespaces(
+            label_selector=self._label_selector
+        )
+
+        phases = dict()
+        for pod in pod_list.items:
+            pods = phases.setdefault(pod.metadata.namespace, dict())
+            pods[pod.metadata.name] = pod.status.phase if pod.status else None
+
+        with self._lock:
+            self._phases = phases
+        self._synced.set()
+
+        logging.debug(f"Listed {len(pod_list.items)} LCM Service pods")
+
+        return pod_list.metadata.resource_version
+
+    def _watch(self, resource_version: str) -> Union[str, None]:
+        stream = watch.Watch().stream(
+            k8s.core_v1.list_pod_for_all_namespaces,
+            label_selector=self._label_selector,
+            resource_version=resource_version,
+            timeout_seconds=self._resync_period,
+        )
+
+        for event in stream:
+            if self._stopped.is_set():
+                return None
+
+            pod = event["object"]
+            if event["type"] == "DELETED":
+                self._delete(pod)
+            elif event["type"] in ("ADDED", "MODIFIED"):
+                self._set(pod)
+            else:
+                continue
+
+            resource_version = pod.metadata.resource_version
+
+        return resource_version
+
+    def _run(self):
+        resource_version = None
+
+        while not self._stopped.is_set():
+            try:
+                if resource_version is None:
+                    resource_version = self._list()
+                resource_version = self._watch(resource_version)
+            except ApiException as err:
+                if err.status == 410:
+                    logging.info("Pod watch expired, listing pods again")
+                else:
+                    logging.error(f"Cannot watch LCM Service pods: {err}")
+                    self._synced.clear()
+                    time.sleep(self._retry_delay)
+                resource_version = None
+            except Exception as err:
+                logging.error(f"Cannot watch LCM Service pods: {err}")
+                self._synced.clear()
+                resource_version = None
+                time.sleep(self._retry_delay)
+
+        self._thread = None
+
+
+pod_cache = PodPhaseCache(
+    resync_period=int(os.getenv("LCM_ENGINE_POD_CACHE_RESYNC_PERIOD", 300))
+)
@@ -0,0 +1,74 @@
+import asyncio
+import logging
+import os
+from typing import Iterable, Mapping
+
+from lcm_engine.models.connectivity_health import ConnectivityHealth
+
+PROBE_TIMEOUT = float(os.getenv("LCM_ENGINE_PROBE_TIMEOUT", 1.0))
+
+
+async def probe(
+    host: str,
+    port: int,
+    path: str = "/version",
+    timeout: float = PROBE_TIMEOUT,
+) -> str:
+    """Return how far a request to the host gets.
+
+    An accepted TCP connection counts as layer 4 connectivity, any HTTP
+    response to ``GET path`` below 500 as layer 7 connectivity.
+    """
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout
+        )
+    except (OSError, asyncio.TimeoutError) as err:
+        logging.debug(f"Cannot connect to {host}:{port}: {err!r}")
+        return ConnectivityHealth.NONE
+
+    try:
+        writer.write(
+            f"GET {path} HTTP/1.1\r\n"
+            f"Host: {host}\r\n"
+            "Connection: close\r\n\r\n".encode("ascii")
+        )
+        await asyncio.wait_for(writer.drain(), timeout)
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+    except (OSError, asyncio.TimeoutError) as err:
+        logging.debug(f"No HTTP response from {host}:{port}: {err!r}")
+        return ConnectivityHealth.LAYER4
+    finally:
+        writer.close()
+
+    parts = status_line.decode("latin-1").split()
+    if (
+        len(parts) >= 2
+        and parts[0].startswith("HTTP/")
+        and parts[1].isdigit()
+        and int(parts[1]) < 500
+    ):
+        return ConnectivityHealth.LAYER7
+
+    return ConnectivityHealth.LAYER4
+
+
+async def _probe_all(
+    hosts: Iterable[str], port: int, concurrency: int
+) -> Mapping[str, str]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(host: str) -> str:
+        async with semaphore:
+            return await probe(host, port)
+
+    hosts = list(hosts)
+    results = await asyncio.gather(*(limited(host) for host in hosts))
+    return dict(zip(hosts, results))
+
+
+def probe_all(
+    hosts: Iterable[str], port: int, concurrency: int = 16
+) -> Mapping[str, str]:
+    """Probe all hosts concurrently and map each one to its connectivity."""
+    return asyncio.run(_probe_all(hosts, port, concurrency))
@@ -0,0 +1,152 @@
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import StringIO
+from threading import Lock
+from traceback import print_exc
+from typing import Mapping, Union
+
+from flask import Flask
+
+from lcm_engine.db_models.models import db
+from lcm_engine.db_models.project import Project as DBProject, ProjectState
+from lcm_engine.k8sops.lcm_service import LCMServiceDeployer
+from lcm_engine.metrics import PROVISIONED_PROJECTS
+
+
+class ProvisioningProgress:
+    def __init__(self, project_id: int):
+        self.project_id = project_id
+        self.state = ProjectState.PENDING
+        self.step = None
+        self.error = None
+
+    def __repr__(self):
+        return (
+            f"<ProvisioningProgress {self.project_id} "
+            f"{self.state} {self.step}>"
+        )
+
+
+class ProjectProvisioner:
+    def __init__(self, max_workers: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="lcm-provisioner"
+        )
+        self._lock = Lock()
+        self._progress: Mapping[int, ProvisioningProgress] = dict()
+
+    def submit(
+        self,
+        flask_app: Flask,
+        project_id: int,
+        deployer: LCMServiceDeployer,
+    ) -> Future:
+        logging.info(f"Scheduling provisioning of project {project_id}")
+
+        with self._lock:
+            self._progress[project_id] = ProvisioningProgress(project_id)
+
+        return self._executor.submit(
+            self._provision, flask_app, project_id, deployer
+        )
+
+    def progress(self, project_id: int) -> Union[ProvisioningProgress, None]:
+        with self._lock:
+            return self._progress.get(project_id)
+
+    def forget(self, project_id: int):
+        # the error of a failed project is reported until it is deleted
+        with self._lock:
+            self._progress.pop(project_id, None)
+
+    def fail_interrupted(self):
+        # projects left behind by a restart are never picked up again
+        interrupted = db.session.execute(
+            db.select(DBProject).where(
+                DBProject.state.in_(
+                    (ProjectState.PENDING, ProjectState.DEPLOYING)
+                )
+            )
+        ).scalars().all()
+
+        for db_project in interrupted:
+            logging.warning(
+                f"Provisioning of project {db_project.id} was interrupted"
+            )
+            db_project.state = ProjectState.FAILED
+
+        try:
+            db.session.commit()
+        except Exception as err:
+            logging.error(f"Cannot mark interrupted projects: {err}")
+            db.session.rollback()
+
+    def _set_step(self, project_id: int, step: str):
+        logging.info(f"Provisioning project {project_id}: {step}")
+        with self._lock:
+            self._progress[project_id].step = step
+
+    def _set_state(
+        self, project_id: int, state: str, error: Union[str, None] = None
+    ):
+        with self._lock:
+            progress = self._progress[project_id]
+            progress.state = state
+            progress.error = error
+
+        if state in (ProjectState.AVAILABLE, ProjectState.FAILED):
+            PROVISIONED_PROJECTS.labels(state).inc()
+
+        db_project = db.session.get(DBProject, project_id)
+        if db_project is None:
+            logging.warning(f"Project {project_id} no longer exists")
+            return
+        if db_project.state == ProjectState.TERMINATING:
+            logging.warning(f"Project {project_id} is being deleted")
+            return
+
+        db_project.state = state
+        db_project.available = state == ProjectState.AVAILABLE
+        db.session.commit()
+
+    def _provision(
+        self,
+        flask_app: Flask,
+        project_id: int,
+        deployer: LCMServiceDeployer,
+    ):
+        with flask_app.app_context():
+            try:
+                self._set_state(project_id, ProjectState.DEPLOYING)
+                deployer.deploy(
+                    on_step=lambda step: self._set_step(project_id, step)
+                )
+                # TODO: restrict ingress routes to specific users
+                self._set_state(project_id, ProjectState.AVAILABLE)
+            except Exception as err:
+                logging.error(
+                    f"Provisioning of project {project_id} failed: {err}"
+                )
+                with StringIO() as stream:
+                    print_exc(file=stream)
+                    logging.debug(stream.getvalue())
+                db.session.rollback()
+                try:
+                    self._set_state(
+                        project_id, ProjectState.FAILED, error=str(err)
+                    )
+                except Exception as state_err:
+                    logging.error(
+                        f"Cannot record failure of project {project_id}: "
+                        f"{state_err}"
+                    )
+                    db.session.rollback()
+            finally:
+                deployer.close()
+                db.session.remove()
+
+
+provisioner = ProjectProvisioner(
+    int(os.getenv("LCM_ENGINE_PROVISIONER_WORKERS", 4))
+)
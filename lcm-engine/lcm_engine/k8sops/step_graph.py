@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, List, Mapping, Union
+
+
+class StepGraph:
+    def __init__(self):
+        self._steps: Mapping[str, Callable[[], Any]] = dict()
+        self._dependencies: Mapping[str, List[str]] = dict()
+
+    def add(
+        self,
+        name: str,
+        step: Callable[[], Any],
+        depends_on: Iterable[str] = (),
+    ):
+        if name in self._steps:
+            raise ValueError(f"Step {name} is already defined")
+
+        self._steps[name] = step
+        self._dependencies[name] = list(depends_on)
+
+    def __len__(self):
+        return len(self._steps)
+
+    def _validate(self):
+        for name, dependencies in self._dependencies.items():
+            for dependency in dependencies:
+                if dependency not in self._steps:
+                    raise ValueError(
+                        f"Step {name} depends on unknown step {dependency}"
+                    )
+
+    def _run_timed(self, name: str) -> float:
+        start = time.monotonic()
+        self._steps[name]()
+        return time.monotonic() - start
+
+    async def _run_timed_async(self, name: str) -> float:
+        start = time.monotonic()
+        await self._steps[name]()
+        return time.monotonic() - start
+
+    def run(
+        self,
+        max_workers: Union[int, None] = None,
+        on_step: Union[Callable[[str], None], None] = None,
+    ) -> Mapping[str, float]:
+        self._validate()
+
+        timings = dict()
+        pending = dict(self._dependencies)
+        running = dict()
+        error = None
+
+        with ThreadPoolExecutor(
+            max_workers=max_workers or max(len(self._steps), 1),
+            thread_name_prefix="lcm-step",
+        ) as executor:
+            while pending or running:
+                if error is None:
+                    ready = [
+                        name for name, dependencies in pending.items()
+                        if all(dep in timings for dep in dependencies)
+                    ]
+                    for name in ready:
+                        del pending[name]
+                        if on_step:
+                            on_step(name)
+                        running[executor.submit(self._run_timed, name)] = name
+
+                if not running:
+                    if error is None:
+                        raise ValueError(
+                            "Steps have circular dependencies: "
+                            f"{', '.join(pending)}"
+                        )
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        timings[name] = future.result()
+                        logging.info(
+                            f"Step {name} took {timings[name]:.3f} s"
+                        )
+                    except Exception as err:
+                        logging.error(f"Step {name} failed: {err}")
+                        error = error or err
+
+        if error is not None:
+            raise error
+
+        return timings
+
+    async def run_async(
+        self,
+        on_step: Union[Callable[[str], None], None] = None,
+    ) -> Mapping[str, float]:
+        # same as run(), for steps that are coroutine functions
+        self._validate()
+
+        timings = dict()
+        pending = dict(self._dependencies)
+        running = dict()
+        error = None
+
+        while pending or running:
+            if error is None:
+                ready = [
+                    name for name, dependencies in pending.items()
+                    if all(dep in timings for dep in dependencies)
+                ]
+                for name in ready:
+                    del pending[name]
+                    if on_step:
+                        on_step(name)
+                    task = asyncio.ensure_future(self._run_timed_async(name))
+                    running[task] = name
+
+            if not running:
+                if error is None:
+                    raise ValueError(
+                        "Steps have circular dependencies: "
+                        f"{', '.join(pending)}"
+                    )
+                break
+
+            done, _ = await asyncio.wait(
+                running, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                name = running.pop(task)
+                try:
+                    timings[name] = task.result()
+                    logging.info(f"Step {name} took {timings[name]:.3f} s")
+                except Exception as err:
+                    logging.error(f"Step {name} failed: {err}")
+                    error = error or err
+
+        if error is not None:
+            raise error
+
+        return timings
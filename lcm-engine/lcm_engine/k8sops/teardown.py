@@ -0,0 +1,241 @@
+import logging
+import os
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from io import StringIO
+from threading import Lock
+from traceback import print_exc
+from typing import Iterable, List, Mapping, Set, Union
+
+from flask import Flask
+from sqlalchemy import exists
+
+from lcm_engine.db_models.deployment_package import \
+    DeploymentPackage as DBDeploymentPackage
+from lcm_engine.db_models.models import db
+from lcm_engine.db_models.project import Project as DBProject, ProjectState
+from lcm_engine.db_models.workspace import Workspace as DBWorkspace
+from lcm_engine.k8sops.lcm_service import (
+    construct_namespace_name,
+    undeploy_lcm_service,
+    wait_for_namespace_deletion,
+)
+from lcm_engine.k8sops.provisioner import provisioner
+from lcm_engine.metrics import TEARDOWN_SECONDS
+
+
+class TeardownProgress:
+    def __init__(self, project_id: int):
+        self.project_id = project_id
+        self.step = None
+        self.error = None
+
+    def __repr__(self):
+        return f"<TeardownProgress {self.project_id} {self.step}>"
+
+
+def release_package(package_digest: str):
+    # only delete the package once no project refers to it anymore
+    result = db.session.execute(
+        db.delete(DBDeploymentPackage)
+        .where(DBDeploymentPackage.digest == package_digest)
+        .where(~exists().where(DBProject.package_digest == package_digest))
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        logging.info(f"Deleted unused deployment package {package_digest}")
+
+
+class ProjectTeardown:
+    """Deletes LCM Service namespaces and forgets projects once they are gone.
+
+    Projects are marked as terminating by the caller and keep their rows
+    until Kubernetes has finalized their namespace, so a namespace that is
+    still terminating is never reused. Namespaces are deleted concurrently
+    by a pool of workers. A workspace that is torn down is marked as
+    terminating by the caller as well and deleted after its last project.
+    """
+
+    def __init__(self, max_workers: int, timeout: float):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="lcm-teardown"
+        )
+        self._timeout = timeout
+        self._lock = Lock()
+        self._progress: Mapping[int, TeardownProgress] = dict()
+        # workspace ID: IDs of projects that are still being torn down
+        self._workspaces: Mapping[int, Set[int]] = dict()
+
+    def submit(
+        self,
+        flask_app: Flask,
+        workspace_id: int,
+        project_ids: Iterable[int],
+        delete_workspace: bool = False,
+    ) -> List[Future]:
+        project_ids = list(project_ids)
+
+        with self._lock:
+            if delete_workspace:
+                pending = self._workspaces.setdefault(workspace_id, set())
+                pending.update(project_ids)
+            # projects that are already being torn down are not resubmitted
+            project_ids = [
+                project_id
+                for project_id in project_ids
+                if project_id not in self._progress
+                or self._progress[project_id].error is not None
+            ]
+            for project_id in project_ids:
+                self._progress[project_id] = TeardownProgress(project_id)
+
+        logging.info(
+            f"Scheduling teardown of projects {project_ids} "
+            f"in workspace {workspace_id}"
+        )
+
+        return [
+            self._executor.submit(
+                self._teardown, flask_app, workspace_id, project_id
+            )
+            for project_id in project_ids
+        ]
+
+    def progress(self, project_id: int) -> Union[TeardownProgress, None]:
+        with self._lock:
+            return self._progress.get(project_id)
+
+    def resume_interrupted(self, flask_app: Flask) -> List[Future]:
+        # namespace deletion is idempotent, so teardowns are simply restarted
+        terminating = db.session.execute(
+            db.select(DBProject).where(
+                DBProject.state == ProjectState.TERMINATING
+            )
+        ).scalars().all()
+
+        project_ids: Mapping[int, List[int]] = dict()
+        for db_project in terminating:
+            logging.warning(
+                f"Teardown of project {db_project.id} was interrupted"
+            )
+            project_ids.setdefault(db_project.workspace_id, []).append(
+                db_project.id
+            )
+
+        db_workspaces = db.session.execute(
+            db.select(DBWorkspace).filter_by(terminating=True)
+        ).scalars().all()
+
+        # interrupted after the records of their last project were deleted
+        for db_workspace in db_workspaces:
+            if not db_workspace.projects:
+                logging.info(f"Deleting workspace {db_workspace.id}")
+                db.session.delete(db_workspace)
+
+        try:
+            db.session.commit()
+        except Exception as err:
+            logging.error(f"Cannot delete terminating workspaces: {err}")
+            db.session.rollback()
+
+        terminating_workspaces = {w.id for w in db_workspaces}
+        return [
+            future
+            for workspace_id, ids in project_ids.items()
+            for future in self.submit(
+                flask_app,
+                workspace_id,
+                ids,
+                delete_workspace=workspace_id in terminating_workspaces,
+            )
+        ]
+
+    def _set_step(self, project_id: int, step: str):
+        logging.info(f"Tearing down project {project_id}: {step}")
+        with self._lock:
+            self._progress[project_id].step = step
+
+    def _set_error(self, project_id: int, error: str):
+        with self._lock:
+            self._progress[project_id].error = error
+
+    def _namespace_name(self, workspace_id: int, project_id: int) -> str:
+        # projects bound to a warm LCM Service keep its namespace
+        db_project = db.session.get(DBProject, project_id)
+        if db_project is None or db_project.container_id == "unknown":
+            return construct_namespace_name(workspace_id, project_id)
+        return db_project.container_id
+
+    def _forget(self, workspace_id: int, project_id: int):
+        self._set_step(project_id, "deleting records")
+
+        db_project = db.session.get(DBProject, project_id)
+        if db_project is not None:
+            db.session.delete(db_project)
+            db.session.flush()
+            release_package(db_project.package_digest)
+            db.session.commit()
+
+        provisioner.forget(project_id)
+        with self._lock:
+            self._progress.pop(project_id, None)
+            pending = self._workspaces.get(workspace_id)
+            if pending is None:
+                return
+            pending.discard(project_id)
+            if pending:
+                return
+            del self._workspaces[workspace_id]
+
+        db_workspace = db.session.get(DBWorkspace, workspace_id)
+        if db_workspace is not None:
+            logging.info(f"Deleting workspace {workspace_id}")
+            db.session.delete(db_workspace)
+            db.session.commit()
+
+    def _teardown(self, flask_app: Flask, workspace_id: int, project_id: int):
+        start = time.monotonic()
+
+        with flask_app.app_context():
+            try:
+                namespace_name = self._namespace_name(
+                    workspace_id, project_id
+                )
+
+                self._set_step(project_id, "deleting namespace")
+                undeploy_lcm_service(namespace_name)
+
+                self._set_step(project_id, "waiting for finalization")
+                if not wait_for_namespace_deletion(
+                    namespace_name, self._timeout
+                ):
+                    raise TimeoutError(
+                        f"Namespace {namespace_name} still exists after "
+                        f"{self._timeout} s"
+                    )
+
+                self._forget(workspace_id, project_id)
+                TEARDOWN_SECONDS.labels("ok").observe(
+                    time.monotonic() - start
+                )
+            except Exception as err:
+                # the project stays terminating, deleting it again retries
+                logging.error(
+                    f"Teardown of project {project_id} failed: {err}"
+                )
+                with StringIO() as stream:
+                    print_exc(file=stream)
+                    logging.debug(stream.getvalue())
+                db.session.rollback()
+                self._set_error(project_id, str(err))
+                TEARDOWN_SECONDS.labels("error").observe(
+                    time.monotonic() - start
+                )
+            finally:
+                db.session.remove()
+
+
+teardown = ProjectTeardown(
+    max_workers=int(os.getenv("LCM_ENGINE_TEARDOWN_WORKERS", 16)),
+    timeout=float(os.getenv("LCM_ENGINE_TEARDOWN_TIMEOUT", 900)),
+)
@@ -0,0 +1,219 @@
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from secrets import token_hex
+from threading import Event, Lock
+from typing import List, Mapping, Union
+
+from lcm_engine.db_models.models import db
+from lcm_engine.db_models.project import Project as DBProject
+from lcm_engine.k8sops.k8sclient import k8s
+from lcm_engine.k8sops.lcm_service import (
+    LCM_SERVICE_KINDS,
+    WARM_POOL_LABEL,
+    WARM_POOL_STATE_LABEL,
+    LCMServiceKind,
+    WarmLCMServiceDeployer,
+    undeploy_lcm_service,
+)
+from lcm_engine.metrics import WARM_POOL_IDLE
+
+
+class WarmPool:
+    """Idle LCM Services, ready to be bound to new projects.
+
+    For every kind, ``size`` LCM Services are deployed ahead of time into
+    namespaces of their own. A new project takes one of them, which skips
+    creating the namespace, pulling the image and starting the pod, and a
+    replacement is deployed in the background.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        kinds: Mapping[str, LCMServiceKind] = LCM_SERVICE_KINDS,
+        timeout: float = 300.0,
+        retry_delay: float = 30.0,
+    ):
+        self._size = size
+        self._kinds = kinds
+        self._timeout = timeout
+        self._retry_delay = retry_delay
+
+        self._lock = Lock()
+        # kind: names of namespaces with a running, idle LCM Service
+        self._idle: Mapping[str, List[str]] = {kind: [] for kind in kinds}
+        # kind: number of LCM Services that are still starting
+        self._warming: Mapping[str, int] = {kind: 0 for kind in kinds}
+        self._stopped = Event()
+        self._executor = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._size > 0
+
+    def start(self):
+        if not self.enabled or self._executor is not None:
+            return
+
+        logging.info(
+            f"Keeping {self._size} idle LCM Services of each kind: "
+            f"{', '.join(self._kinds)}"
+        )
+        self._stopped.clear()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self._size * len(self._kinds),
+            thread_name_prefix="lcm-warm-pool",
+        )
+
+        self._adopt()
+        for kind in self._kinds:
+            self._replenish(kind)
+
+    def stop(self):
+        self._stopped.set()
+
+    def acquire(self, kind: str) -> Union[str, None]:
+        """Take an idle LCM Service of the kind out of the pool.
+
+        Returns the name of its namespace, or ``None`` if none is ready.
+        """
+        if self._executor is None or kind not in self._kinds:
+            return None
+
+        with self._lock:
+            idle = self._idle[kind]
+            namespace_name = idle.pop(0) if idle else None
+            WARM_POOL_IDLE.labels(kind).set(len(idle))
+
+        self._replenish(kind)
+
+        if namespace_name is None:
+            logging.info(f"No idle {kind} LCM Service in the warm pool")
+        else:
+            logging.info(f"Took {kind} LCM Service in {namespace_name}")
+
+        return namespace_name
+
+    def release(self, kind: str, namespace_name: str):
+        """Return an LCM Service that was acquired but never bound."""
+        with self._lock:
+            idle = self._idle[kind]
+            keep = len(idle) + self._warming[kind] < self._size
+            if keep:
+                idle.append(namespace_name)
+            WARM_POOL_IDLE.labels(kind).set(len(idle))
+
+        if keep:
+            logging.info(f"Returned {kind} LCM Service in {namespace_name}")
+            return
+
+        # a replacement is already on its way
+        logging.info(f"Deleting surplus {kind} LCM Service in {namespace_name}")
+        try:
+            undeploy_lcm_service(namespace_name)
+        except Exception as err:
+            logging.error(f"Cannot delete namespace {namespace_name}: {err}")
+
+    def _adopt(self):
+        # idle LCM Services left behind by a previous run, except the ones
+        # that projects took before it stopped
+        in_use = set(db.session.execute(
+            db.select(DBProject.container_id)
+        ).scalars().all())
+
+        try:
+            namespace_list = k8s.core_v1.list_namespace(
+                label_selector=f"{WARM_POOL_STATE_LABEL}=idle"
+            )
+        except Exception as err:
+            logging.error(f"Cannot list idle LCM Services: {err}")
+            return
+
+        for namespace in namespace_list.items:
+            namespace_name = namespace.metadata.name
+            kind = (namespace.metadata.labels or dict()).get(WARM_POOL_LABEL)
+            if kind not in self._kinds or namespace_name in in_use:
+                continue
+
+            logging.info(f"Adopting {kind} LCM Service in {namespace_name}")
+            with self._lock:
+                self._warming[kind] += 1
+            self._executor.submit(
+                self._warm_up, kind, namespace_name, deploy=False
+            )
+
+    def _replenish(self, kind: str):
+        with self._lock:
+            missing = max(
+                self._size - len(self._idle[kind]) - self._warming[kind], 0
+            )
+            self._warming[kind] += missing
+
+        for _ in range(missing):
+            self._executor.submit(
+                self._warm_up, kind, f"lcm-service-pool-{kind}-{token_hex(4)}"
+            )
+
+    def _warm_up(self, kind: str, namespace_name: str, deploy: bool = True):
+        try:
+            if deploy:
+                logging.info(
+                    f"Deploying idle {kind} LCM Service in {namespace_name}"
+                )
+                WarmLCMServiceDeployer(
+                    namespace_name, self._kinds[kind]
+                ).deploy()
+
+            if not self._wait_until_running(namespace_name):
+                raise TimeoutError(
+                    f"LCM Service is not running after {self._timeout} s"
+                )
+        except Exception as err:
+            logging.error(
+                f"Cannot warm up {kind} LCM Service in {namespace_name}: "
+                f"{err}"
+            )
+            try:
+                undeploy_lcm_service(namespace_name)
+            except Exception as delete_err:
+                logging.error(
+                    f"Cannot delete namespace {namespace_name}: {delete_err}"
+                )
+
+            with self._lock:
+                self._warming[kind] -= 1
+
+            # the cluster may be out of resources, so wait before retrying
+            if not self._stopped.wait(self._retry_delay):
+                self._replenish(kind)
+            return
+
+        with self._lock:
+            self._warming[kind] -= 1
+            self._idle[kind].append(namespace_name)
+            WARM_POOL_IDLE.labels(kind).set(len(self._idle[kind]))
+
+        logging.info(f"Idle {kind} LCM Service in {namespace_name} is ready")
+
+    def _wait_until_running(self, namespace_name: str) -> bool:
+        deadline = time.monotonic() + self._timeout
+        while not self._stopped.is_set():
+            pod_list = k8s.core_v1.list_namespaced_pod(
+                namespace_name, field_selector="status.phase=Running"
+            )
+            if pod_list.items:
+                return True
+
+            if time.monotonic() > deadline:
+                return False
+            self._stopped.wait(1)
+
+        return False
+
+
+warm_pool = WarmPool(
+    int(os.getenv("LCM_ENGINE_WARM_POOL_SIZE", 0)),
+    timeout=float(os.getenv("LCM_ENGINE_WARM_POOL_TIMEOUT", 300)),
+)
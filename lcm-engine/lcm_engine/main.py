@@ -1,29 +1,149 @@
 #!/usr/bin/env python3
 import os
-import logging
 
-import connexion
-from flask.logging import default_handler
 
-from lcm_engine import encoder
-from lcm_engine.db_models.models import db
+def env_flag(name, default="false"):
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "t")
+
+
+# must run before anything imports socket, ssl or threading
+DB_GEVENT = env_flag("LCM_ENGINE_DB_GEVENT")
+if DB_GEVENT:
+    from gevent import monkey
+    monkey.patch_all()
+
+import logging  # noqa: E402
+
+import connexion  # noqa: E402
+from flask.logging import default_handler  # noqa: E402
+from gevent.socket import wait_read, wait_write  # noqa: E402
+from psycopg2 import OperationalError, extensions  # noqa: E402
+from sqlalchemy import func, inspect  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+
+from lcm_engine import encoder, metrics  # noqa: E402
+from lcm_engine.db_models.models import db  # noqa: E402
+from lcm_engine.db_models.project import Project as DBProject  # noqa: E402
+from lcm_engine.db_models.schema_version import (  # noqa: E402
+    SCHEMA_VERSION,
+    SchemaVersion,
+)
+from lcm_engine.health_checker import health_checker  # noqa: E402
+from lcm_engine.k8sops.async_client import (  # noqa: E402
+    K8S_BACKEND,
+    async_k8s,
+)
+from lcm_engine.k8sops.pod_cache import pod_cache  # noqa: E402
+from lcm_engine.k8sops.provisioner import provisioner  # noqa: E402
+from lcm_engine.k8sops.teardown import teardown  # noqa: E402
+from lcm_engine.k8sops.warm_pool import warm_pool  # noqa: E402
+
+
+def gevent_wait_callback(conn, timeout=None):
+    # lets psycopg2 yield to other greenlets while waiting for the database
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            break
+        elif state == extensions.POLL_READ:
+            wait_read(conn.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(conn.fileno(), timeout=timeout)
+        else:
+            raise OperationalError(f"Bad result from poll: {state}")
+
+
+def engine_options(con_str):
+    url = make_url(con_str)
+    if url.get_backend_name() == "sqlite":
+        return dict()
+
+    options = dict(
+        pool_size=int(os.getenv("LCM_ENGINE_DB_POOL_SIZE", 10)),
+        max_overflow=int(os.getenv("LCM_ENGINE_DB_MAX_OVERFLOW", 10)),
+        pool_timeout=float(os.getenv("LCM_ENGINE_DB_POOL_TIMEOUT", 30)),
+        pool_recycle=int(os.getenv("LCM_ENGINE_DB_POOL_RECYCLE", 1800)),
+        pool_pre_ping=env_flag("LCM_ENGINE_DB_POOL_PRE_PING", "true"),
+    )
+
+    statement_timeout = float(os.getenv("LCM_ENGINE_DB_STATEMENT_TIMEOUT", 30))
+    if url.get_backend_name() == "postgresql" and statement_timeout > 0:
+        options["connect_args"] = dict(
+            options=f"-c statement_timeout={int(statement_timeout * 1000)}"
+        )
+
+    return options
+
+
+def check_schema():
+    # a single catalog lookup instead of reflecting every table on each boot
+    inspector = inspect(db.engine)
+    if not inspector.has_table(
+        SchemaVersion.__tablename__, schema=SchemaVersion.__table__.schema
+    ):
+        # databases of earlier versions have tables but no schema version
+        if inspector.has_table(
+            DBProject.__tablename__, schema=DBProject.__table__.schema
+        ):
+            raise RuntimeError(
+                "Database has no schema version, migrate the database first"
+            )
+
+        logging.info(f"Creating database schema version {SCHEMA_VERSION}")
+        db.create_all()
+        db.session.add(SchemaVersion(version=SCHEMA_VERSION))
+        db.session.commit()
+        return
+
+    version = db.session.execute(
+        db.select(func.max(SchemaVersion.version))
+    ).scalar()
+    if version != SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} does not match the expected "
+            f"version {SCHEMA_VERSION}, migrate the database first"
+        )
 
 
 def init_db(flask_app):
     con_str = os.getenv("LCM_ENGINE_DB_CONNECTION_STRING")
     flask_app.config["SQLALCHEMY_DATABASE_URI"] = con_str
     flask_app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+    flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(con_str)
+
+    if DB_GEVENT:
+        extensions.set_wait_callback(gevent_wait_callback)
 
     flask_app.app_context().push()
 
     db.app = flask_app
     db.init_app(flask_app)
 
-    db.create_all()
+    check_schema()
+
+
+def check_k8s_backend():
+    if K8S_BACKEND not in ("sync", "asyncio"):
+        raise RuntimeError(f"Unknown k8s backend {K8S_BACKEND}")
+    if K8S_BACKEND == "asyncio" and not async_k8s.available:
+        raise RuntimeError(
+            "The asyncio k8s backend requires the kubernetes_asyncio package"
+        )
+    logging.info(f"Using the {K8S_BACKEND} k8s backend")
 
 
 def create_app(specification_dir="./openapi"):
     app = connexion.App(__name__, specification_dir=specification_dir)
+
+    app.app.json_encoder = encoder.JSONEncoder
+    app.add_api(
+        "openapi.yaml",
+        arguments=dict(title="LCM Engine API"),
+        strict_validation=True,
+        validate_responses=True,
+        pythonic_params=True,
+    )
+
     return app
 
 
@@ -40,22 +160,21 @@ def main():
 
     root_logger = logging.getLogger()
     root_logger.addHandler(default_handler)
-    flask_debug = os.getenv("FLASK_DEBUG", False)
-    if flask_debug is not None:
-        flask_debug = flask_debug.lower() in ("1", "true", "yes", "t")
+    flask_debug = env_flag("FLASK_DEBUG")
     root_logger.setLevel(logging.DEBUG if flask_debug else logging.INFO)
 
-    con_app.app.json_encoder = encoder.JSONEncoder
-    con_app.add_api(
-        "openapi.yaml",
-        arguments=dict(title="LCM Engine API"),
-        strict_validation=True,
-        validate_responses=True,
-        pythonic_params=True,
-    )
-
     get_config(con_app.app)
+    check_k8s_backend()
     init_db(con_app.app)
+    metrics.init_app(con_app.app)
+    provisioner.fail_interrupted()
+    teardown.resume_interrupted(con_app.app)
+    warm_pool.start()
+
+    if env_flag("LCM_ENGINE_POD_CACHE", "true"):
+        pod_cache.start()
+
+    health_checker.start(con_app.app)
 
     con_app.run(port=8080, server="gevent")
 
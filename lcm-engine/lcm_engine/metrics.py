@@ -0,0 +1,113 @@
+import time
+
+from flask import Flask, g, has_request_context, request
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+REQUEST_SECONDS = Histogram(
+    "lcm_engine_request_seconds",
+    "Time spent handling API requests",
+    ["endpoint", "method", "status"],
+)
+
+AUTH_SECONDS = Histogram(
+    "lcm_engine_auth_seconds",
+    "Time spent authorizing API requests",
+    ["result"],
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "lcm_engine_db_query_seconds",
+    "Time spent executing database queries",
+    ["endpoint"],
+)
+
+K8S_REQUEST_SECONDS = Histogram(
+    "lcm_engine_k8s_request_seconds",
+    "Time spent in Kubernetes API requests",
+    ["method", "resource", "status"],
+)
+
+DEPLOY_STEP_SECONDS = Histogram(
+    "lcm_engine_deploy_step_seconds",
+    "Time spent in LCM Service deployment steps",
+    ["step"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+
+DEPLOY_SECONDS = Histogram(
+    "lcm_engine_deploy_seconds",
+    "Time spent deploying LCM Services",
+    ["result"],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120, 300),
+)
+
+TEARDOWN_SECONDS = Histogram(
+    "lcm_engine_teardown_seconds",
+    "Time spent deleting LCM Service namespaces until they are finalized",
+    ["result"],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 900),
+)
+
+WARM_POOL_IDLE = Gauge(
+    "lcm_engine_warm_pool_idle",
+    "Idle LCM Services that are ready to be bound to new projects",
+    ["kind"],
+)
+
+PROVISIONED_PROJECTS = Counter(
+    "lcm_engine_provisioned_projects_total",
+    "Projects that finished provisioning",
+    ["state"],
+)
+
+
+def current_endpoint() -> str:
+    if has_request_context():
+        return request.endpoint or "unknown"
+    return "background"
+
+
+def _before_request():
+    g.metrics_request_start = time.monotonic()
+
+
+def _after_request(response):
+    start = g.pop("metrics_request_start", None)
+    if start is not None:
+        REQUEST_SECONDS.labels(
+            current_endpoint(), request.method, response.status_code
+        ).observe(time.monotonic() - start)
+    return response
+
+
+def _before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    conn.info.setdefault("metrics_query_start", []).append(time.monotonic())
+
+
+def _after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+):
+    start = conn.info["metrics_query_start"].pop()
+    DB_QUERY_SECONDS.labels(current_endpoint()).observe(
+        time.monotonic() - start
+    )
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("metrics_query_start"):
+        conn.info["metrics_query_start"].pop()
+
+
+def init_app(flask_app: Flask):
+    flask_app.before_request(_before_request)
+    flask_app.after_request(_after_request)
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
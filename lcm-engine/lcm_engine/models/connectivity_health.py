@@ -18,7 +18,9 @@ class ConnectivityHealth(Model):
     """
     NONE = "none"
     LAYER3 = "layer3"
+    LAYER4 = "layer4"
     LAYER5 = "layer5"
+    LAYER7 = "layer7"
 
     def __init__(self):  # noqa: E501
         """ConnectivityHealth - a model defined in OpenAPI"""
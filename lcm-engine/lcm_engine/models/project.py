@@ -3,6 +3,8 @@
 from __future__ import absolute_import
 
 
+import re  # noqa: F401,E501
+
 from lcm_engine.models.base_model_ import Model
 from lcm_engine import util
 
@@ -14,7 +16,13 @@ class Project(Model):
     """
 
     def __init__(
-        self, id=None, name=None, workspace=None, csar=None, kind=None
+        self,
+        id=None,
+        name=None,
+        workspace=None,
+        csar=None,
+        csar_digest=None,
+        kind=None,
     ):  # noqa: E501
         """Project - a model defined in OpenAPI
 
@@ -26,6 +34,8 @@ class Project(Model):
         :type workspace: int
         :param csar: The csar of this Project.  # noqa: E501
         :type csar: str
+        :param csar_digest: The csar_digest of this Project.  # noqa: E501
+        :type csar_digest: str
         :param kind: The kind of this Project.  # noqa: E501
         :type kind: str
         """
@@ -34,6 +44,7 @@ class Project(Model):
             "name": str,
             "workspace": int,
             "csar": str,
+            "csar_digest": str,
             "kind": str,
         }
 
@@ -42,6 +53,7 @@ class Project(Model):
             "name": "name",
             "workspace": "workspace",
             "csar": "csar",
+            "csar_digest": "csarDigest",
             "kind": "kind",
         }
 
@@ -49,6 +61,7 @@ class Project(Model):
         self._name = name
         self._workspace = workspace
         self._csar = csar
+        self._csar_digest = csar_digest
         self._kind = kind
 
     @classmethod
@@ -155,12 +168,35 @@ class Project(Model):
         :param csar: The csar of this Project.
         :type csar: str
         """
-        if csar is None:
+
+        self._csar = csar
+
+    @property
+    def csar_digest(self):
+        """Gets the csar_digest of this Project.
+
+        SHA-256 digest of the CSAR. Projects may refer to an already uploaded CSAR by its digest instead of sending the csar.  # noqa: E501
+
+        :return: The csar_digest of this Project.
+        :rtype: str
+        """
+        return self._csar_digest
+
+    @csar_digest.setter
+    def csar_digest(self, csar_digest):
+        """Sets the csar_digest of this Project.
+
+        SHA-256 digest of the CSAR. Projects may refer to an already uploaded CSAR by its digest instead of sending the csar.  # noqa: E501
+
+        :param csar_digest: The csar_digest of this Project.
+        :type csar_digest: str
+        """
+        if csar_digest is not None and not re.search(r'^[0-9a-f]{64}$', csar_digest):  # noqa: E501
             raise ValueError(
-                "Invalid value for `csar`, must not be `None`"
+                "Invalid value for `csar_digest`, must be a follow pattern or equal to `/^[0-9a-f]{64}$/`"
             )  # noqa: E501
 
-        self._csar = csar
+        self._csar_digest = csar_digest
 
     @property
     def kind(self):
@@ -0,0 +1,103 @@
+import json
+from contextlib import contextmanager
+
+import pytest
+from kubernetes.client import ApiClient, Configuration
+from sqlalchemy import event
+from sqlalchemy.pool import StaticPool
+from urllib3.response import HTTPResponse
+
+from lcm_engine.db_models.models import db
+from lcm_engine.main import create_app
+# register every model with the metadata before creating the tables
+from lcm_engine.db_models import (  # noqa: F401
+    deployment_package,
+    env_secret,
+    file_secret,
+    project,
+    secret,
+    secret_workspace,
+    user,
+    user_workspace,
+    workspace,
+)
+
+
+@pytest.fixture(scope="session")
+def api_app():
+    flask_app = create_app().app
+    flask_app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite://"
+    flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"] = dict(
+        poolclass=StaticPool,
+        connect_args=dict(check_same_thread=False),
+    )
+    db.init_app(flask_app)
+
+    with flask_app.app_context():
+        # tables live in the "public" schema, as they do in PostgreSQL
+        @event.listens_for(db.engine, "connect")
+        def attach_public_schema(dbapi_connection, connection_record):
+            dbapi_connection.execute("ATTACH DATABASE ':memory:' AS public")
+
+    return flask_app
+
+
+@pytest.fixture
+def app(api_app):
+    with api_app.app_context():
+        # every test gets a new in-memory database
+        db.engine.dispose()
+        db.create_all()
+        yield api_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def count_statements(app):
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(
+                db.engine, "before_cursor_execute", before_cursor_execute
+            )
+
+    return counter
+
+
+class RecordingPoolManager:
+    """Answers k8s API requests with queued responses and records them."""
+
+    def __init__(self):
+        self.requests = []
+        self.responses = []
+
+    def request(self, method, url, body=None, headers=None, **kwargs):
+        self.requests.append((method, url, body, headers))
+        status, data = self.responses.pop(0)
+        return HTTPResponse(
+            body=json.dumps(data).encode(),
+            status=status,
+            headers={"Content-Type": "application/json"},
+        )
+
+
+@pytest.fixture
+def api_client():
+    configuration = Configuration()
+    configuration.host = "https://kubernetes.test"
+    api_client = ApiClient(configuration)
+    api_client.rest_client.pool_manager = RecordingPoolManager()
+    return api_client
@@ -0,0 +1,31 @@
+import json
+
+from lcm_engine.k8sops.apply import ServerSideApplier
+
+
+def test_apply_sends_manifest_as_object(api_client):
+    pool_manager = api_client.rest_client.pool_manager
+    pool_manager.responses.append((200, dict(kind="ConfigMap")))
+
+    manifest = dict(
+        apiVersion="v1",
+        kind="ConfigMap",
+        metadata=dict(name="tosca", namespace="project", labels=None),
+        data=dict(key="value"),
+    )
+    applied = ServerSideApplier(api_client).apply(manifest)
+
+    assert applied == dict(kind="ConfigMap")
+    [(method, url, body, headers)] = pool_manager.requests
+    assert method == "PATCH"
+    assert url == (
+        "https://kubernetes.test/api/v1/namespaces/project/configmaps/tosca"
+        "?fieldManager=lcm-engine&force=true"
+    )
+    assert headers["Content-Type"] == "application/apply-patch+yaml"
+    assert json.loads(body) == dict(
+        apiVersion="v1",
+        kind="ConfigMap",
+        metadata=dict(name="tosca", namespace="project"),
+        data=dict(key="value"),
+    )
@@ -0,0 +1,40 @@
+import pytest
+
+from lcm_engine.deployment_package import DeploymentPackage
+from lcm_engine.k8sops import lcm_service
+from lcm_engine.k8sops.lcm_service import (
+    PACKAGE_DIGEST_ANNOTATION,
+    PARTIAL_OBJECT_METADATA,
+    K8sConfigMap,
+)
+
+
+@pytest.fixture
+def pool_manager(api_client, monkeypatch):
+    monkeypatch.setattr(lcm_service.k8s, "_api_client", api_client)
+    return api_client.rest_client.pool_manager
+
+
+@pytest.mark.parametrize("status, annotations, applied", [
+    (200, {PACKAGE_DIGEST_ANNOTATION: "digest"}, True),
+    (200, {PACKAGE_DIGEST_ANNOTATION: "other"}, False),
+    (200, None, False),
+    (404, None, False),
+])
+def test_config_map_is_applied_from_metadata(
+    pool_manager, monkeypatch, status, annotations, applied
+):
+    monkeypatch.setattr(DeploymentPackage, "digest", "digest")
+    pool_manager.responses.append(
+        (status, dict(metadata=dict(name="tosca", annotations=annotations)))
+    )
+
+    config_map = K8sConfigMap("project", "tosca", DeploymentPackage())
+
+    assert config_map.is_applied() == applied
+    [(method, url, body, headers)] = pool_manager.requests
+    assert method == "GET"
+    assert url == (
+        "https://kubernetes.test/api/v1/namespaces/project/configmaps/tosca"
+    )
+    assert headers["Accept"] == PARTIAL_OBJECT_METADATA
@@ -0,0 +1,113 @@
+import pytest
+from flask import g
+
+from lcm_engine.controllers.helper import auth_cache
+from lcm_engine.db_models.deployment_package import DeploymentPackage
+from lcm_engine.db_models.env_secret import EnvSecret
+from lcm_engine.db_models.file_secret import FileSecret
+from lcm_engine.db_models.loader_options import SECRET_DEPLOY_VIEW
+from lcm_engine.db_models.models import db
+from lcm_engine.db_models.project import Project
+from lcm_engine.db_models.secret import Secret
+from lcm_engine.db_models.secret_workspace import SecretWorkspace
+from lcm_engine.db_models.user import User
+from lcm_engine.db_models.user_workspace import UserWorkspace
+from lcm_engine.db_models.workspace import Workspace
+
+OIDC_ID = "john.doe@example.com"
+DIGEST = "0" * 64
+
+
+def populate(start, count):
+    # every workspace and secret belongs to the user, while all projects
+    # and secrets are in the first workspace
+    user = db.session.execute(
+        db.select(User).filter_by(oidc_identifier=OIDC_ID)
+    ).scalar_one_or_none() or User(oidc_identifier=OIDC_ID)
+    package = db.session.get(DeploymentPackage, DIGEST) or DeploymentPackage(
+        digest=DIGEST, contents=b"csar", size=4
+    )
+    first_workspace = db.session.get(Workspace, 1)
+
+    for i in range(start, start + count):
+        db_workspace = Workspace(name=f"workspace-{i}")
+        first_workspace = first_workspace or db_workspace
+        db_secret = Secret(name=f"secret-{i}", user=user)
+        db.session.add_all([
+            db_workspace,
+            db_secret,
+            UserWorkspace(user=user, workspace=db_workspace, is_owner=True),
+            Project(
+                name=f"project-{i}",
+                container_id=f"lcm-service-{i}",
+                available=True,
+                package=package,
+                kind="si.xlab.lcm-service.tosca",
+                workspace=first_workspace,
+            ),
+            SecretWorkspace(secret=db_secret, workspace=first_workspace),
+            FileSecret(
+                path="/tmp/key",
+                contents=b"secret",
+                contents_hash="hash",
+                secret=db_secret,
+            ),
+            EnvSecret(name="TOKEN", value="secret", secret=db_secret),
+        ])
+
+    db.session.commit()
+    db.session.expunge_all()
+
+
+def list_items(client, count_statements, path):
+    # authorization is looked up the same way for every request, requests
+    # share the app context of the test, and with it the memo in g
+    auth_cache.clear()
+    g.pop("lcm_engine_auth", None)
+    with count_statements() as statements:
+        response = client.get(path, headers={"X-Forwarded-User": OIDC_ID})
+
+    assert response.status_code == 200, response.json
+    return response.json, len(statements)
+
+
+@pytest.mark.parametrize("path, check", [
+    ("/secret", lambda items: (
+        items[0]["workspaces"] == [1] and items[0]["env"] == dict(TOKEN="secret")
+    )),
+    ("/workspace/1/secret", lambda items: items[0]["workspaces"] == [1]),
+    ("/workspace", lambda items: (
+        items[0]["projects"] == list(range(1, len(items) + 1))
+        and items[1]["projects"] == []
+    )),
+    ("/workspace/1/project", lambda items: items[0]["csarDigest"] == DIGEST),
+])
+def test_list_statements_do_not_grow(app, client, count_statements, path, check):
+    populate(0, 2)
+    _, few_statements = list_items(client, count_statements, path)
+
+    populate(2, 18)
+    items, many_statements = list_items(client, count_statements, path)
+
+    assert len(items) == 20
+    assert check(items)
+    assert many_statements == few_statements
+
+
+@pytest.mark.parametrize("count", [1, 20])
+def test_secret_deploy_view(app, count_statements, count):
+    populate(0, count)
+
+    with count_statements() as statements:
+        db_secrets = db.session.execute(
+            db.select(Secret).options(*SECRET_DEPLOY_VIEW)
+        ).scalars().all()
+        api_secrets = [
+            db_secret.to_api_model(disclose_contents=True)
+            for db_secret in db_secrets
+        ]
+
+    assert len(api_secrets) == count
+    assert api_secrets[0].file.contents == "secret"
+    # secrets, workspaces, file secrets, env secrets
+    assert len(statements) == 4
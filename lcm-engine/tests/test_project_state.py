@@ -0,0 +1,137 @@
+from base64 import b64encode
+
+import pytest
+
+from lcm_engine.controllers import project_controller
+from lcm_engine.controllers.helper import auth_cache
+from lcm_engine.db_models.deployment_package import DeploymentPackage
+from lcm_engine.db_models.models import db
+from lcm_engine.db_models.project import Project, ProjectState
+from lcm_engine.db_models.user import User
+from lcm_engine.db_models.user_workspace import UserWorkspace
+from lcm_engine.db_models.workspace import Workspace
+from lcm_engine.k8sops.provisioner import ProjectProvisioner
+
+
+@pytest.fixture
+def workspace(app):
+    app.config["LCM_ENGINE_HOSTNAME"] = None
+    app.config["LCM_ENGINE_CERTIFICATE_SECRET_NAME"] = None
+    # user IDs cached by earlier tests belong to other databases
+    auth_cache.clear()
+
+    db_workspace = Workspace(name="workspace")
+    db.session.add(UserWorkspace(
+        user=User(oidc_identifier="user"),
+        workspace=db_workspace,
+        is_owner=True,
+    ))
+    db.session.commit()
+    return db_workspace
+
+
+@pytest.fixture
+def submitted(monkeypatch):
+    submitted = []
+    monkeypatch.setattr(
+        project_controller.provisioner, "submit",
+        lambda flask_app, project_id, deployer: submitted.append(project_id),
+    )
+    monkeypatch.setattr(
+        project_controller.warm_pool, "acquire", lambda kind: None
+    )
+    return submitted
+
+
+def add_project(workspace, state):
+    digest = "0" * 64
+    if db.session.get(DeploymentPackage, digest) is None:
+        db.session.add(DeploymentPackage(digest=digest, contents=b"", size=0))
+    db_project = Project(
+        name=state,
+        container_id="unknown",
+        available=state == ProjectState.AVAILABLE,
+        package_digest=digest,
+        workspace=workspace,
+        kind="si.xlab.lcm-service.tosca",
+        state=state,
+    )
+    db.session.add(db_project)
+    db.session.commit()
+    return db_project
+
+
+def test_create_returns_before_provisioning(app, workspace, submitted):
+    body = dict(
+        name="project",
+        kind="si.xlab.lcm-service.tosca",
+        csar=b64encode(b"csar").decode(),
+    )
+    with app.test_request_context(
+        json=body, headers={"X-Forwarded-User": "user"}
+    ):
+        reference, status = project_controller.create_workspace_project(
+            workspace.id
+        )
+
+    assert status == 202
+    assert submitted == [reference.id]
+    db_project = db.session.get(Project, reference.id)
+    assert db_project.state == ProjectState.PENDING
+    assert not db_project.available
+
+
+def test_fail_interrupted_fails_unfinished_projects(app, workspace):
+    states = (
+        ProjectState.PENDING,
+        ProjectState.DEPLOYING,
+        ProjectState.AVAILABLE,
+        ProjectState.FAILED,
+    )
+    project_ids = {
+        state: add_project(workspace, state).id for state in states
+    }
+
+    ProjectProvisioner(max_workers=1).fail_interrupted()
+
+    db.session.expire_all()
+    assert {
+        state: db.session.get(Project, project_id).state
+        for state, project_id in project_ids.items()
+    } == {
+        ProjectState.PENDING: ProjectState.FAILED,
+        ProjectState.DEPLOYING: ProjectState.FAILED,
+        ProjectState.AVAILABLE: ProjectState.AVAILABLE,
+        ProjectState.FAILED: ProjectState.FAILED,
+    }
+
+
+def test_digest_of_another_users_project_is_not_found(
+    app, workspace, submitted
+):
+    other_workspace = Workspace(name="other")
+    db.session.add(UserWorkspace(
+        user=User(oidc_identifier="other"),
+        workspace=other_workspace,
+        is_owner=True,
+    ))
+    add_project(other_workspace, ProjectState.AVAILABLE)
+
+    body = dict(
+        name="project", kind="si.xlab.lcm-service.tosca", csarDigest="0" * 64
+    )
+    with app.test_request_context(
+        json=body, headers={"X-Forwarded-User": "user"}
+    ):
+        _, status = project_controller.create_workspace_project(workspace.id)
+    assert status == 404
+
+    add_project(workspace, ProjectState.AVAILABLE)
+    with app.test_request_context(
+        json=body, headers={"X-Forwarded-User": "user"}
+    ):
+        reference, status = project_controller.create_workspace_project(
+            workspace.id
+        )
+    assert status == 202
+    assert submitted == [reference.id]
@@ -0,0 +1,44 @@
+import pytest
+
+from lcm_engine.db_models.models import db
+from lcm_engine.db_models.schema_version import (
+    SCHEMA_VERSION,
+    SchemaVersion,
+)
+from lcm_engine.main import check_schema
+
+
+def test_empty_database_is_created_and_stamped(app):
+    db.drop_all()
+
+    check_schema()
+
+    assert db.session.execute(
+        db.select(SchemaVersion.version)
+    ).scalars().all() == [SCHEMA_VERSION]
+
+
+def test_current_database_is_accepted(app):
+    db.session.add(SchemaVersion(version=SCHEMA_VERSION))
+    db.session.commit()
+
+    check_schema()
+
+
+def test_unversioned_database_is_not_stamped(app):
+    SchemaVersion.__table__.drop(db.engine)
+
+    with pytest.raises(RuntimeError, match="no schema version"):
+        check_schema()
+
+    assert not db.inspect(db.engine).has_table(
+        SchemaVersion.__tablename__, schema="public"
+    )
+
+
+def test_outdated_database_is_rejected(app):
+    db.session.add(SchemaVersion(version=SCHEMA_VERSION - 1))
+    db.session.commit()
+
+    with pytest.raises(RuntimeError, match="migrate the database first"):
+        check_schema()
@@ -0,0 +1,81 @@
+from concurrent.futures import wait
+
+import pytest
+
+from lcm_engine.db_models.deployment_package import DeploymentPackage
+from lcm_engine.db_models.models import db
+from lcm_engine.db_models.project import Project, ProjectState
+from lcm_engine.db_models.workspace import Workspace
+from lcm_engine.k8sops import teardown as project_teardown
+from lcm_engine.k8sops.teardown import ProjectTeardown
+
+
+@pytest.fixture
+def forgotten(monkeypatch):
+    forgotten = []
+    monkeypatch.setattr(
+        project_teardown.provisioner, "forget", forgotten.append
+    )
+    return forgotten
+
+
+@pytest.fixture
+def undeployed(monkeypatch):
+    undeployed = []
+    monkeypatch.setattr(
+        project_teardown, "undeploy_lcm_service", undeployed.append
+    )
+    monkeypatch.setattr(
+        project_teardown, "wait_for_namespace_deletion",
+        lambda namespace_name, timeout: True,
+    )
+    return undeployed
+
+
+def add_workspace(name, terminating, project_states):
+    digest = "0" * 64
+    if db.session.get(DeploymentPackage, digest) is None:
+        db.session.add(DeploymentPackage(digest=digest, contents=b"", size=0))
+
+    db_workspace = Workspace(name=name, terminating=terminating)
+    db.session.add(db_workspace)
+    db.session.add_all(
+        Project(
+            name=f"{name}-{i}",
+            container_id=f"{name}-{i}",
+            available=False,
+            package_digest=digest,
+            workspace=db_workspace,
+            kind="si.xlab.lcm-service.tosca",
+            state=state,
+        )
+        for i, state in enumerate(project_states)
+    )
+    db.session.commit()
+    return db_workspace.id
+
+
+def test_resume_interrupted_deletes_terminating_workspaces(
+    app, undeployed, forgotten
+):
+    deleted_id = add_workspace(
+        "deleted", True, [ProjectState.TERMINATING] * 2
+    )
+    emptied_id = add_workspace("emptied", True, [])
+    kept_id = add_workspace(
+        "kept", False, [ProjectState.TERMINATING, ProjectState.AVAILABLE]
+    )
+
+    futures = ProjectTeardown(
+        max_workers=1, timeout=1
+    ).resume_interrupted(app)
+    wait(futures)
+
+    db.session.expire_all()
+    assert sorted(undeployed) == ["deleted-0", "deleted-1", "kept-0"]
+    assert len(forgotten) == 3
+    assert db.session.get(Workspace, deleted_id) is None
+    assert db.session.get(Workspace, emptied_id) is None
+    assert [
+        p.name for p in db.session.get(Workspace, kept_id).projects
+    ] == ["kept-1"]
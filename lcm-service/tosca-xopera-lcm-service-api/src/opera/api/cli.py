@@ -1,6 +1,7 @@
 import os
 import shutil
 import connexion
+from opera.api.controllers.invocation_logs import serve
 from opera.api.log import get_logger
 from opera.api.openapi import encoder
 
@@ -32,7 +33,11 @@ def main():
 
         app.app.json_encoder = encoder.JSONEncoder
         app.add_api("openapi.yaml", arguments={"title": "xOpera API"}, pythonic_params=True)
-        app.run(port=int(os.getenv("OPERA_API_PORT", 8080)), debug=DEBUG)
+        port = int(os.getenv("OPERA_API_PORT", 8080))
+        if DEBUG:
+            app.run(port=port, debug=DEBUG)
+        else:
+            serve(app.app, port)
     except Exception as e:
         print(f"Exception: {str(e)}")
 
@@ -2,14 +2,19 @@ import datetime
 import json
 import multiprocessing
 import os
+import queue
+import sys
+import threading
 import traceback
 import typing
 import uuid
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 
+from opera.api.controllers.invocation_store import InvocationStore
 from opera.api.log import get_logger
-from opera.api.openapi.models import Invocation, InvocationState, OperationType
+from opera.api.metrics import INVOCATION_QUEUE_DEPTH, INVOCATIONS_REJECTED, INVOCATIONS_RUNNING
+from opera.api.openapi.models import Invocation, InvocationState, InvocationSummary, OperationType
 from opera.commands.deploy import deploy_service_template as opera_deploy
 from opera.commands.diff import diff_instances as opera_diff_instances
 from opera.commands.notify import notify as opera_notify
@@ -21,67 +26,96 @@ from opera.storage import Storage
 
 logger = get_logger(__name__)
 
+WORKERS = int(os.getenv("OPERA_API_INVOCATION_WORKERS", "2"))
+MAX_PENDING = int(os.getenv("OPERA_API_MAX_PENDING_INVOCATIONS", "100"))
+
+invocation_store = InvocationStore(Path(".opera-api", "invocations.sqlite"))
+
 
 class InvocationWorkerProcess(multiprocessing.Process):
-    IN_PROGRESS_STDOUT_FILE = "/tmp/xopera-api-inprogress-stdout.txt"
-    IN_PROGRESS_STDERR_FILE = "/tmp/xopera-api-inprogress-stderr.txt"
+    LOG_DIR = Path(".opera-api", "logs")
 
-    def __init__(self, work_queue: multiprocessing.Queue):
+    def __init__(self, index: int, work_queue: multiprocessing.Queue, done_queue: multiprocessing.Queue):
         super(InvocationWorkerProcess, self).__init__(
-            group=None, target=self._run_internal, name="Invocation-Worker", args=(),
+            group=None, target=self._run_internal, name="Invocation-Worker-{}".format(index), args=(),
             kwargs={
+                "index": index,
                 "work_queue": work_queue,
+                "done_queue": done_queue,
             }, daemon=None)
+        self.index = index
+        self.work_queue = work_queue
+
+    @staticmethod
+    def log_path(eye_dee: str, stream: str) -> Path:
+        return InvocationWorkerProcess.LOG_DIR / "{}.{}".format(eye_dee, stream)
 
     @staticmethod
-    def _run_internal(work_queue: multiprocessing.Queue):
-        file_stdout = open(InvocationWorkerProcess.IN_PROGRESS_STDOUT_FILE, "w")
-        file_stderr = open(InvocationWorkerProcess.IN_PROGRESS_STDERR_FILE, "w")
+    def _redirect(fd: int, path: Path):
+        file_fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.dup2(file_fd, fd)
+        os.close(file_fd)
 
-        os.dup2(file_stdout.fileno(), 1)
-        os.dup2(file_stderr.fileno(), 2)
+    @staticmethod
+    def _run_internal(index: int, work_queue: multiprocessing.Queue, done_queue: multiprocessing.Queue):
+        # output is followed while invocations run, so it must not wait in buffers
+        sys.stdout.reconfigure(line_buffering=True)
+        sys.stderr.reconfigure(line_buffering=True)
+        InvocationWorkerProcess.LOG_DIR.mkdir(parents=True, exist_ok=True)
 
         while True:
             inv: Invocation = work_queue.get(block=True)
+            InvocationWorkerProcess._invoke(inv)
+            done_queue.put(index)
 
-            inv.state = InvocationState.IN_PROGRESS
-            InvocationService.write_invocation(inv)
+    @staticmethod
+    def _invoke(inv: Invocation):
+        stdout_path = InvocationWorkerProcess.log_path(inv.id, "stdout")
+        stderr_path = InvocationWorkerProcess.log_path(inv.id, "stderr")
+        InvocationWorkerProcess._redirect(1, stdout_path)
+        InvocationWorkerProcess._redirect(2, stderr_path)
 
-            try:
-                if inv.operation == OperationType.DEPLOY:
-                    InvocationWorkerProcess._deploy(inv.service_template, inv.inputs, num_workers=1,
-                                                    clean_state=inv.clean_state)
-                elif inv.operation == OperationType.UNDEPLOY:
-                    InvocationWorkerProcess._undeploy(num_workers=1)
-                elif inv.operation == OperationType.NOTIFY:
-                    # we abuse service_template and inputs a bit, but they match
-                    InvocationWorkerProcess._notify(inv.service_template, inv.inputs)
-                elif inv.operation == OperationType.DEPLOY:
-                    InvocationWorkerProcess._update(inv.service_template, inv.inputs, num_workers=1)
-                else:
-                    raise RuntimeError("Unknown operation type:" + str(inv.operation))
-
-                inv.state = InvocationState.SUCCESS
-            except BaseException as e:
-                if isinstance(e, RuntimeError):
-                    raise e
-                inv.state = InvocationState.FAILED
-                inv.exception = "{}: {}\n\n{}".format(e.__class__.__name__, str(e), traceback.format_exc())
-
-            file_stdout.flush()
-            os.fsync(file_stdout.fileno())
-            file_stderr.flush()
-            os.fsync(file_stderr.fileno())
-            instance_state = InvocationService.get_instance_state()
-            stdout = InvocationWorkerProcess.read_file(InvocationWorkerProcess.IN_PROGRESS_STDOUT_FILE)
-            stderr = InvocationWorkerProcess.read_file(InvocationWorkerProcess.IN_PROGRESS_STDERR_FILE)
-            file_stdout.truncate()
-            file_stderr.truncate()
-
-            inv.instance_state = instance_state
-            inv.stdout = stdout
-            inv.stderr = stderr
-            InvocationService.write_invocation(inv)
+        inv.state = InvocationState.IN_PROGRESS
+        InvocationService.write_invocation(inv)
+
+        num_workers = inv.num_workers or 1
+        try:
+            if inv.operation == OperationType.DEPLOY:
+                InvocationWorkerProcess._deploy(inv.service_template, inv.inputs, num_workers=num_workers,
+                                                clean_state=inv.clean_state)
+            elif inv.operation == OperationType.UNDEPLOY:
+                InvocationWorkerProcess._undeploy(num_workers=num_workers)
+            elif inv.operation == OperationType.NOTIFY:
+                # we abuse service_template and inputs a bit, but they match
+                InvocationWorkerProcess._notify(inv.service_template, inv.inputs)
+            elif inv.operation == OperationType.UPDATE:
+                InvocationWorkerProcess._update(inv.service_template, inv.inputs, num_workers=num_workers)
+            else:
+                raise RuntimeError("Unknown operation type:" + str(inv.operation))
+
+            inv.state = InvocationState.SUCCESS
+        except BaseException as e:
+            if isinstance(e, RuntimeError):
+                raise e
+            inv.state = InvocationState.FAILED
+            inv.exception = "{}: {}\n\n{}".format(e.__class__.__name__, str(e), traceback.format_exc())
+
+        sys.stdout.flush()
+        os.fsync(1)
+        sys.stderr.flush()
+        os.fsync(2)
+        instance_state = InvocationService.get_instance_state()
+        stdout = InvocationWorkerProcess.read_file(stdout_path)
+        stderr = InvocationWorkerProcess.read_file(stderr_path)
+
+        inv.instance_state = instance_state
+        inv.stdout = stdout
+        inv.stderr = stderr
+        InvocationService.write_invocation(inv)
+
+        # the output is kept in the store from now on, open log tails keep reading the unlinked files
+        stdout_path.unlink(missing_ok=True)
+        stderr_path.unlink(missing_ok=True)
 
     @staticmethod
     def _deploy(service_template: str, inputs: typing.Optional[dict], num_workers: int, clean_state: bool):
@@ -124,14 +158,119 @@ class InvocationWorkerProcess(multiprocessing.Process):
             return f.read()
 
 
+class InvocationQueueFull(Exception):
+    pass
+
+
+class InvocationScheduler:
+    """
+    Runs invocations on a pool of worker processes.
+
+    Invocations that change the deployment lock the opera storage, so they run one at a time and in the order they
+    were made. Notifications do not lock it and run on any idle worker, even while a long deployment is running.
+
+    Invocations are stored as pending before they are queued, so the store holds every queued invocation and they
+    can be queued again after a restart. At most ``max_pending`` invocations wait for a worker.
+    """
+
+    STORAGE_LOCK = ".opera"
+
+    def __init__(self, size: int, max_pending: int):
+        self._max_pending = max_pending
+        self._condition = threading.Condition()
+        self._pending: List[Invocation] = []
+        self._running: Dict[int, Invocation] = {}
+        self._locks: Set[str] = set()
+        self._done_queue: multiprocessing.Queue = multiprocessing.Queue()
+        self._workers = [self._start_worker(index) for index in range(size)]
+
+        threading.Thread(target=self._collect, name="Invocation-Collector", daemon=True).start()
+
+    def submit(self, inv: Invocation, bounded: bool = True):
+        with self._condition:
+            if bounded and len(self._pending) >= self._max_pending:
+                INVOCATIONS_REJECTED.inc()
+                raise InvocationQueueFull("{} invocations are already waiting.".format(len(self._pending)))
+
+            # workers overwrite the state, so it must be stored before they get the invocation
+            InvocationService.write_invocation(inv)
+            self._pending.append(inv)
+            self._assign()
+
+    @classmethod
+    def _lock_of(cls, inv: Invocation) -> Optional[str]:
+        if inv.operation == OperationType.NOTIFY:
+            return None
+        return cls.STORAGE_LOCK
+
+    def _start_worker(self, index: int) -> InvocationWorkerProcess:
+        worker = InvocationWorkerProcess(index, multiprocessing.Queue(), self._done_queue)
+        worker.start()
+        return worker
+
+    def _assign(self):
+        idle = [worker for worker in self._workers if worker.index not in self._running]
+        for inv in list(self._pending):
+            if not idle:
+                break
+
+            lock = self._lock_of(inv)
+            if lock is not None and lock in self._locks:
+                continue
+            if lock is not None:
+                self._locks.add(lock)
+
+            worker = idle.pop(0)
+            self._pending.remove(inv)
+            self._running[worker.index] = inv
+            worker.work_queue.put(inv)
+
+        INVOCATION_QUEUE_DEPTH.set(len(self._pending))
+        INVOCATIONS_RUNNING.set(len(self._running))
+
+    def _finish(self, index: int):
+        inv = self._running.pop(index, None)
+        if inv is not None:
+            self._locks.discard(self._lock_of(inv))
+        self._assign()
+
+    def _collect(self):
+        while True:
+            try:
+                index = self._done_queue.get(timeout=1)
+            except queue.Empty:
+                self._replace_dead_workers()
+                continue
+
+            with self._condition:
+                self._finish(index)
+
+    def _replace_dead_workers(self):
+        with self._condition:
+            for worker in self._workers:
+                if worker.is_alive():
+                    continue
+
+                logger.error("Invocation worker %s exited with code %s.", worker.index, worker.exitcode)
+                inv = self._running.get(worker.index)
+                if inv is not None:
+                    inv.state = InvocationState.FAILED
+                    inv.exception = "Invocation worker exited with code {}.".format(worker.exitcode)
+                    InvocationService.write_invocation(inv)
+
+                self._workers[worker.index] = self._start_worker(worker.index)
+                self._finish(worker.index)
+
+
 class InvocationService:
     def __init__(self):
-        self.work_queue: multiprocessing.Queue = multiprocessing.Queue()
-        self.worker = InvocationWorkerProcess(self.work_queue)
-        self.worker.start()
+        invocation_store.import_files(Path(".opera-api"))
+
+        self.scheduler = InvocationScheduler(WORKERS, MAX_PENDING)
+        self._recover()
 
     def invoke(self, operation_type: OperationType, service_template: Optional[str], inputs: Optional[any],
-               clean_state: Optional[bool]) -> Invocation:
+               clean_state: Optional[bool], num_workers: Optional[int] = None) -> Invocation:
         invocation_uuid = str(uuid.uuid4())
         now = datetime.datetime.now(tz=datetime.timezone.utc)
         logger.info("Invoking %s with ID %s at %s", operation_type, invocation_uuid, now.isoformat())
@@ -144,63 +283,73 @@ class InvocationService:
         inv.service_template = service_template
         inv.inputs = inputs
         inv.clean_state = clean_state or False
+        inv.num_workers = num_workers or 1
         inv.instance_state = None
         inv.exception = None
         inv.stdout = None
         inv.stderr = None
-        self.write_invocation(inv)
 
-        self.work_queue.put(inv)
+        self.scheduler.submit(inv)
         return inv
 
+    def _recover(self):
+        # invocations left behind by a restart: pending ones are queued again, but an interrupted operation may have
+        # left the deployment half done, so it is failed and the user decides how to continue
+        for inv in invocation_store.by_state(InvocationState.IN_PROGRESS, InvocationState.PENDING):
+            if inv.state == InvocationState.PENDING:
+                logger.info("Queueing pending invocation %s again.", inv.id)
+                self.scheduler.submit(inv, bounded=False)
+                continue
+
+            logger.warning("Invocation %s was interrupted.", inv.id)
+            for stream in ("stdout", "stderr"):
+                path = InvocationWorkerProcess.log_path(inv.id, stream)
+                if path.exists():
+                    setattr(inv, stream, InvocationWorkerProcess.read_file(path))
+            inv.state = InvocationState.FAILED
+            inv.exception = "Interrupted by a restart of xOpera API."
+            self.write_invocation(inv)
+
     @classmethod
-    def invocation_history(cls) -> List[Invocation]:
+    def invocation_history(cls, limit: Optional[int] = None, before: Optional[str] = None,
+                           since: Optional[str] = None) -> List[Invocation]:
         logger.info("Loading invocation history.")
+        return [
+            cls._with_progress(inv) for inv in invocation_store.history(limit=limit, before=before, since=since)
+        ]
 
-        invocations = []
-        for file_path in Path(".opera-api").glob('*.json'):
-            logger.debug(file_path)
-            invocation = Invocation.from_dict(json.load(file_path.open(mode='r')))
-
-            if invocation.state == InvocationState.IN_PROGRESS:
-                invocation.stdout = InvocationWorkerProcess.read_file(InvocationWorkerProcess.IN_PROGRESS_STDOUT_FILE)
-                invocation.stderr = InvocationWorkerProcess.read_file(InvocationWorkerProcess.IN_PROGRESS_STDERR_FILE)
-
-            invocations.append(invocation)
-
-        if invocations:
-            invocations.sort(
-                key=lambda x: datetime.datetime.strptime(
-                    x.timestamp,
-                    '%Y-%m-%dT%H:%M:%S.%f+00:00'
-                ),
-                reverse=True
-            )
-
-        return invocations
+    @classmethod
+    def invocation_summaries(cls, limit: Optional[int] = None, before: Optional[str] = None,
+                             since: Optional[str] = None) -> List[InvocationSummary]:
+        logger.info("Loading invocation summaries.")
+        return invocation_store.summaries(limit=limit, before=before, since=since)
 
     @classmethod
     def latest_invocation(cls) -> Optional[Invocation]:
-        all_invocations = cls.invocation_history()
-        try:
-            return next(all_invocations)
-        except StopIteration:
-            return None
+        inv = invocation_store.latest()
+        return cls._with_progress(inv) if inv else None
 
     @classmethod
     def load_invocation(cls, eye_dee: str) -> Optional[Invocation]:
-        all_invocations = cls.invocation_history()
-        try:
-            return next(inv for inv in all_invocations if inv.id == eye_dee)
-        except StopIteration:
-            return None
+        inv = invocation_store.get(eye_dee)
+        return cls._with_progress(inv) if inv else None
+
+    @classmethod
+    def invocation_exists(cls, eye_dee: str) -> bool:
+        return invocation_store.exists(eye_dee)
 
     @classmethod
     def write_invocation(cls, inv: Invocation):
-        storage = Storage.create(".opera-api")
-        filename = "invocation-{}.json".format(inv.id)
-        dump = json.dumps(inv.to_dict())
-        storage.write(dump, filename)
+        invocation_store.write(inv)
+
+    @classmethod
+    def _with_progress(cls, inv: Invocation) -> Invocation:
+        if inv.state == InvocationState.IN_PROGRESS:
+            for stream in ("stdout", "stderr"):
+                # the worker may not have created the log yet
+                path = InvocationWorkerProcess.log_path(inv.id, stream)
+                setattr(inv, stream, InvocationWorkerProcess.read_file(path) if path.exists() else "")
+        return inv
 
     @classmethod
     def get_instance_state(cls):
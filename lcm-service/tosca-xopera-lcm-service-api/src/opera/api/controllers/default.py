@@ -4,7 +4,10 @@ from datetime import datetime
 from pathlib import PurePath, Path
 
 import pkg_resources
-from opera.api.controllers.background_invocation import InvocationService
+from flask import Response, request
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from opera.api.controllers.background_invocation import InvocationQueueFull, InvocationService
+from opera.api.controllers.invocation_logs import LogTail, parse_offset
 from opera.api.log import get_logger
 from opera.api.openapi.models import ValidationInput, ValidationResult, OperationType, PackagingInput, UnpackagingInput, \
     PackagingResult, Info, DiffRequest, Diff, UpdateRequest
@@ -30,8 +33,12 @@ def deploy(body: DeploymentInput = None):
     logger.debug(body)
 
     deployment_input = DeploymentInput.from_dict(body)
-    result = invocation_service.invoke(OperationType.DEPLOY, deployment_input.service_template,
-                                       deployment_input.inputs, deployment_input.clean_state)
+    try:
+        result = invocation_service.invoke(OperationType.DEPLOY, deployment_input.service_template,
+                                           deployment_input.inputs, deployment_input.clean_state,
+                                           num_workers=deployment_input.num_workers)
+    except InvocationQueueFull as e:
+        return {"message": str(e)}, 429
     return result, 202
 
 
@@ -70,10 +77,13 @@ def diff(body: dict = None):
     return result, 200
 
 
-def undeploy():
+def undeploy(num_workers: int = None):
     logger.debug("Entry: undeploy")
 
-    result = invocation_service.invoke(OperationType.UNDEPLOY, None, None, None)
+    try:
+        result = invocation_service.invoke(OperationType.UNDEPLOY, None, None, None, num_workers=num_workers)
+    except InvocationQueueFull as e:
+        return {"message": str(e)}, 429
     return result, 200
 
 
@@ -81,7 +91,10 @@ def notify(trigger_name: str, body: bytes = None):
     logger.debug("Entry: notify")
     logger.debug("Body: %s", body.decode("UTF-8"))
 
-    result = invocation_service.invoke(OperationType.NOTIFY, trigger_name, body.decode("UTF-8"), None)
+    try:
+        result = invocation_service.invoke(OperationType.NOTIFY, trigger_name, body.decode("UTF-8"), None)
+    except InvocationQueueFull as e:
+        return {"message": str(e)}, 429
     return result, 200
 
 
@@ -100,10 +113,18 @@ def outputs():
     return result, 200
 
 
-def status():
+def status(limit: int = None, since: str = None, summary: bool = False):
     logger.debug("Entry: status")
-    history = invocation_service.invocation_history()
-    return history, 200
+    if since is not None and not invocation_service.invocation_exists(since):
+        return {"message": "No invocation with id {}".format(since)}, 404
+
+    if summary:
+        return invocation_service.invocation_summaries(limit=limit, since=since), 200
+    return invocation_service.invocation_history(limit=limit, since=since), 200
+
+
+def metrics():
+    return generate_latest().decode("utf-8"), 200, {"Content-Type": CONTENT_TYPE_LATEST}
 
 
 def version():
@@ -115,11 +136,23 @@ def version():
 
 def invocation_status(invocation_id):
     logger.debug("Entry: invocation_status")
-    history = invocation_service.invocation_history()
-    try:
-        return next(inv for inv in history if inv.id == invocation_id), 200
-    except StopIteration:
+    inv = invocation_service.load_invocation(invocation_id)
+    if inv is None:
         return {"message": "No invocation with id {}".format(invocation_id)}, 404
+    return inv, 200
+
+
+def invocation_logs(invocation_id, stream: str = "stdout", offset: int = 0):
+    logger.debug("Entry: invocation_logs")
+    if not invocation_service.invocation_exists(invocation_id):
+        return {"message": "No invocation with id {}".format(invocation_id)}, 404
+
+    offset = parse_offset(str(offset), request.headers.get("Last-Event-ID"))
+    if offset is None:
+        return {"message": "Invalid Last-Event-ID."}, 400
+
+    tail = LogTail(invocation_id, stream, offset)
+    return Response(tail.follow(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 
 def validate(body: dict = None):
@@ -180,10 +213,14 @@ def update(body: dict = None):  # noqa: E501
     update_request = UpdateRequest.from_dict(body)
 
     posixnow = int(datetime.utcnow().timestamp())
-    with open("st-operaapi-update-{}.yml".format(posixnow)) as new_st_file:
+    with open("st-operaapi-update-{}.yml".format(posixnow), "w") as new_st_file:
         new_st_file.write(update_request.new_service_template_contents)
         new_st_filename = new_st_file.name
 
-    result = invocation_service.invoke(OperationType.UPDATE, new_st_filename, update_request.inputs, False)
+    try:
+        result = invocation_service.invoke(OperationType.UPDATE, new_st_filename, update_request.inputs, False,
+                                           num_workers=update_request.num_workers)
+    except InvocationQueueFull as e:
+        return {"message": str(e)}, 429
 
     return result, 202
@@ -0,0 +1,162 @@
+import asyncio
+import os
+import re
+import time
+from typing import Iterator, Optional, Tuple
+
+import tornado.httpserver
+import tornado.ioloop
+import tornado.web
+import tornado.wsgi
+from flask import Flask
+from tornado.iostream import StreamClosedError
+
+from opera.api.controllers.background_invocation import InvocationWorkerProcess, invocation_store
+from opera.api.log import get_logger
+from opera.api.openapi.models import InvocationState
+
+logger = get_logger(__name__)
+
+POLL_INTERVAL = float(os.getenv("OPERA_API_LOG_POLL_INTERVAL", "0.2"))
+KEEPALIVE_INTERVAL = 15.0
+READ_SIZE = 64 * 1024
+STREAMS = ("stdout", "stderr")
+
+
+class LogTail:
+    """
+    Server-sent events with the output of an invocation.
+
+    The log file stays open and is only read from where the previous read stopped. The byte offset after every
+    event is sent as its ID, so a client that reconnects with Last-Event-ID continues where it left off. Incomplete
+    lines are held back until the invocation finishes, which is announced with an ``end`` event.
+    """
+
+    def __init__(self, eye_dee: str, stream: str, offset: int = 0):
+        self.eye_dee = eye_dee
+        self.stream = stream
+        self.offset = offset
+        self.finished = False
+        self._file = None
+        self._last_event = time.monotonic()
+
+    def poll(self) -> Tuple[str, bool]:
+        """Events for the output written since the last poll and whether more output is ready right away."""
+        if self.finished:
+            return "", False
+
+        # the state is checked before reading, so no output written before the invocation finished is missed
+        inv = invocation_store.get(self.eye_dee)
+        done = inv is None or inv.state in (InvocationState.SUCCESS, InvocationState.FAILED)
+
+        data = self._read(inv if done else None)
+        more = len(data) == READ_SIZE
+        if not done or more:
+            # hold back an incomplete last line, unless it fills a whole read
+            end = data.rfind(b"\n") + 1
+            if end or not more:
+                data = data[:end]
+
+        events = self._event(data) if data else ""
+        if done and not more:
+            events += "event: end\ndata: {}\n\n".format(inv.state if inv else "")
+            self.close()
+            self.finished = True
+
+        now = time.monotonic()
+        if events:
+            self._last_event = now
+        elif now - self._last_event > KEEPALIVE_INTERVAL:
+            events = ": keepalive\n\n"
+            self._last_event = now
+        return events, more
+
+    def follow(self) -> Iterator[str]:
+        try:
+            while not self.finished:
+                events, more = self.poll()
+                if events:
+                    yield events
+                if not more and not self.finished:
+                    time.sleep(POLL_INTERVAL)
+        finally:
+            self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _read(self, inv) -> bytes:
+        if self._file is None:
+            path = InvocationWorkerProcess.log_path(self.eye_dee, self.stream)
+            if not path.exists():
+                # invocations that have not started yet or whose output was only kept in the store
+                if inv is None:
+                    return b""
+                return (getattr(inv, self.stream) or "").encode()[self.offset:self.offset + READ_SIZE]
+            self._file = path.open(mode="rb")
+
+        # only a held back incomplete line is read again
+        self._file.seek(self.offset)
+        return self._file.read(READ_SIZE)
+
+    def _event(self, data: bytes) -> str:
+        self.offset += len(data)
+        lines = re.split(r"\r\n|\r|\n", data.decode("utf-8", errors="replace"))
+        if not lines[-1]:
+            lines.pop()
+        lines = "".join("data: {}\n".format(line) for line in lines)
+        return "id: {}\n{}\n".format(self.offset, lines)
+
+
+def parse_offset(offset: Optional[str], last_event_id: Optional[str]) -> Optional[int]:
+    offset = last_event_id or offset or "0"
+    return int(offset) if offset.isdigit() else None
+
+
+class InvocationLogHandler(tornado.web.RequestHandler):
+    """
+    Streams invocation logs from the tornado event loop.
+
+    The tornado WSGI container collects whole responses before sending them, so log streams never reach it.
+    """
+
+    async def get(self, invocation_id: str):
+        stream = self.get_query_argument("stream", "stdout")
+        offset = parse_offset(self.get_query_argument("offset", None), self.request.headers.get("Last-Event-ID"))
+        if stream not in STREAMS or offset is None:
+            self.set_status(400)
+            self.finish({"message": "Invalid stream or offset."})
+            return
+        if not invocation_store.exists(invocation_id):
+            self.set_status(404)
+            self.finish({"message": "No invocation with id {}".format(invocation_id)})
+            return
+
+        self.set_header("Content-Type", "text/event-stream")
+        self.set_header("Cache-Control", "no-cache")
+        tail = LogTail(invocation_id, stream, offset)
+        try:
+            while not tail.finished:
+                events, more = tail.poll()
+                if events:
+                    self.write(events)
+                    await self.flush()
+                if not more and not tail.finished:
+                    await asyncio.sleep(POLL_INTERVAL)
+        except StreamClosedError:
+            logger.debug("Client stopped following %s of invocation %s.", stream, invocation_id)
+        finally:
+            tail.close()
+
+
+def serve(flask_app: Flask, port: int):
+    app = tornado.web.Application([
+        (r"/status/([^/]+)/logs", InvocationLogHandler),
+        (r".*", tornado.web.FallbackHandler, dict(fallback=tornado.wsgi.WSGIContainer(flask_app))),
+    ])
+    http_server = tornado.httpserver.HTTPServer(app)
+    http_server.listen(port)
+    logger.info("Listening on port %s.", port)
+    tornado.ioloop.IOLoop.current().start()
@@ -0,0 +1,135 @@
+import datetime
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Optional
+
+from opera.api.log import get_logger
+from opera.api.openapi.models import Invocation, InvocationSummary
+
+logger = get_logger(__name__)
+
+
+class InvocationStore:
+    """
+    Invocations kept in an embedded SQLite database.
+
+    Invocations are looked up by their primary key and the history is read
+    newest-first along the insertion order, so neither gets slower as
+    invocations accumulate. Every process and thread opens its own connection,
+    since the API server and the invocation worker both write to the store.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS invocation (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            id TEXT NOT NULL UNIQUE,
+            state TEXT NOT NULL,
+            operation TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS invocation_state ON invocation (state);
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        # connections must not be shared with a forked worker process
+        if getattr(self._local, "pid", None) != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(self.SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return self._local.connection
+
+    def write(self, inv: Invocation):
+        self._connection().execute(
+            "INSERT INTO invocation (id, state, operation, timestamp, data) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET state = excluded.state, data = excluded.data",
+            (inv.id, str(inv.state), str(inv.operation), inv.timestamp, json.dumps(inv.to_dict()))
+        )
+
+    def get(self, eye_dee: str) -> Optional[Invocation]:
+        row = self._connection().execute("SELECT data FROM invocation WHERE id = ?", (eye_dee,)).fetchone()
+        if row is None:
+            return None
+        return Invocation.from_dict(json.loads(row[0]))
+
+    def exists(self, eye_dee: str) -> bool:
+        return self._connection().execute("SELECT 1 FROM invocation WHERE id = ?", (eye_dee,)).fetchone() is not None
+
+    def history(self, limit: Optional[int] = None, before: Optional[str] = None,
+                since: Optional[str] = None) -> List[Invocation]:
+        """
+        Invocations ordered from the newest to the oldest one.
+
+        Only invocations made after the one with the ``since`` ID and before the one with the ``before`` ID are
+        returned, at most ``limit`` of them.
+        """
+        rows = self._select("data", limit, before, since)
+        return [Invocation.from_dict(json.loads(data)) for data, in rows]
+
+    def summaries(self, limit: Optional[int] = None, before: Optional[str] = None,
+                  since: Optional[str] = None) -> List[InvocationSummary]:
+        """Like history, but without reading the details of invocations."""
+        rows = self._select("id, state, operation, timestamp", limit, before, since)
+        return [
+            InvocationSummary(id=eye_dee, state=state, operation=operation, timestamp=timestamp)
+            for eye_dee, state, operation, timestamp in rows
+        ]
+
+    def _select(self, columns: str, limit: Optional[int], before: Optional[str], since: Optional[str]) -> list:
+        query = "SELECT {} FROM invocation WHERE 1".format(columns)
+        params = []
+        if before is not None:
+            query += " AND seq < (SELECT seq FROM invocation WHERE id = ?)"
+            params.append(before)
+        if since is not None:
+            query += " AND seq > (SELECT seq FROM invocation WHERE id = ?)"
+            params.append(since)
+        query += " ORDER BY seq DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+
+        return self._connection().execute(query, params).fetchall()
+
+    def by_state(self, *states: str) -> List[Invocation]:
+        """Invocations in any of the states, ordered from the oldest to the newest one."""
+        rows = self._connection().execute(
+            "SELECT data FROM invocation WHERE state IN ({}) ORDER BY seq".format(", ".join("?" * len(states))),
+            [str(state) for state in states]
+        ).fetchall()
+        return [Invocation.from_dict(json.loads(data)) for data, in rows]
+
+    def latest(self) -> Optional[Invocation]:
+        invocations = self.history(limit=1)
+        return invocations[0] if invocations else None
+
+    def import_files(self, directory: Path):
+        """Import invocations that older versions stored as one JSON file each."""
+        if self._connection().execute("SELECT 1 FROM invocation LIMIT 1").fetchone() is not None:
+            return
+
+        invocations = []
+        for file_path in directory.glob("invocation-*.json"):
+            with file_path.open(mode="r") as file:
+                invocations.append(Invocation.from_dict(json.load(file)))
+        if not invocations:
+            return
+
+        logger.info("Importing %s invocations from %s.", len(invocations), directory)
+        invocations.sort(key=lambda x: datetime.datetime.fromisoformat(x.timestamp))
+        connection = self._connection()
+        with connection:
+            connection.execute("BEGIN")
+            for inv in invocations:
+                self.write(inv)
@@ -0,0 +1,16 @@
+from prometheus_client import Counter, Gauge
+
+INVOCATION_QUEUE_DEPTH = Gauge(
+    "opera_api_invocation_queue_depth",
+    "Invocations that wait for a worker",
+)
+
+INVOCATIONS_RUNNING = Gauge(
+    "opera_api_invocations_running",
+    "Invocations that are running on a worker",
+)
+
+INVOCATIONS_REJECTED = Counter(
+    "opera_api_invocations_rejected_total",
+    "Invocations that were rejected because the queue was full",
+)
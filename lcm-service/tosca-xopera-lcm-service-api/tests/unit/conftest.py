@@ -0,0 +1,25 @@
+import pytest
+
+from opera.api.controllers import background_invocation, invocation_logs
+from opera.api.controllers.background_invocation import InvocationWorkerProcess
+from opera.api.controllers.invocation_store import InvocationStore
+from opera.api.openapi.models import Invocation, InvocationState, OperationType
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    invocation_store = InvocationStore(tmp_path / "invocations.sqlite")
+    monkeypatch.setattr(background_invocation, "invocation_store", invocation_store)
+    monkeypatch.setattr(invocation_logs, "invocation_store", invocation_store)
+    monkeypatch.setattr(InvocationWorkerProcess, "LOG_DIR", tmp_path / "logs")
+    InvocationWorkerProcess.LOG_DIR.mkdir()
+    return invocation_store
+
+
+@pytest.fixture
+def make_invocation():
+    def make(eye_dee: str, state: str = InvocationState.SUCCESS, operation: str = OperationType.DEPLOY,
+             timestamp: str = "2023-01-01T00:00:00+00:00", **kwargs) -> Invocation:
+        return Invocation(id=eye_dee, state=state, operation=operation, timestamp=timestamp, **kwargs)
+
+    return make
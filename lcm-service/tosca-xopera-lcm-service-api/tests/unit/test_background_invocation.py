@@ -0,0 +1,91 @@
+import queue
+
+import pytest
+
+from opera.api.controllers import background_invocation
+from opera.api.controllers.background_invocation import (
+    InvocationQueueFull,
+    InvocationScheduler,
+    InvocationService,
+    InvocationWorkerProcess,
+)
+from opera.api.openapi.models import InvocationState, OperationType
+
+
+class FakeWorker:
+    def __init__(self, index: int):
+        self.index = index
+        self.work_queue = queue.Queue()
+
+    def is_alive(self) -> bool:
+        return True
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    workers = []
+
+    def start_worker(scheduler, index):
+        workers.append(FakeWorker(index))
+        return workers[-1]
+
+    monkeypatch.setattr(InvocationScheduler, "_start_worker", start_worker)
+    # the collector outlives the test, only a thread queue can be left behind safely
+    monkeypatch.setattr(background_invocation.multiprocessing, "Queue", queue.Queue)
+    return workers
+
+
+def test_deployments_run_in_order_and_notifications_alongside(store, make_invocation, workers):
+    scheduler = InvocationScheduler(size=2, max_pending=10)
+    scheduler.submit(make_invocation("deploy", InvocationState.PENDING))
+    scheduler.submit(make_invocation("update", InvocationState.PENDING, OperationType.UPDATE))
+    scheduler.submit(make_invocation("notify", InvocationState.PENDING, OperationType.NOTIFY))
+
+    assert workers[0].work_queue.get_nowait().id == "deploy"
+    assert workers[1].work_queue.get_nowait().id == "notify"
+    assert store.get("update").state == InvocationState.PENDING
+
+    # the worker reports that it finished the deployment
+    scheduler._done_queue.put(0)
+    assert workers[0].work_queue.get(timeout=5).id == "update"
+    assert workers[1].work_queue.empty()
+
+
+def test_full_queue_rejects_invocations(store, make_invocation, workers):
+    scheduler = InvocationScheduler(size=1, max_pending=1)
+    scheduler.submit(make_invocation("running", InvocationState.PENDING))
+    scheduler.submit(make_invocation("waiting", InvocationState.PENDING))
+
+    with pytest.raises(InvocationQueueFull):
+        scheduler.submit(make_invocation("rejected", InvocationState.PENDING))
+    assert not store.exists("rejected")
+
+    scheduler.submit(make_invocation("recovered", InvocationState.PENDING), bounded=False)
+    assert store.exists("recovered")
+
+
+class RecordingScheduler:
+    def __init__(self):
+        self.submitted = []
+
+    def submit(self, inv, bounded=True):
+        self.submitted.append((inv.id, bounded))
+
+
+def test_recover_requeues_pending_and_fails_interrupted(store, make_invocation):
+    store.write(make_invocation("finished", InvocationState.SUCCESS))
+    store.write(make_invocation("interrupted", InvocationState.IN_PROGRESS))
+    store.write(make_invocation("queued", InvocationState.PENDING))
+    InvocationWorkerProcess.log_path("interrupted", "stdout").write_text("partial output\n")
+
+    service = InvocationService.__new__(InvocationService)
+    service.scheduler = RecordingScheduler()
+    service._recover()
+
+    assert service.scheduler.submitted == [("queued", False)]
+    interrupted = store.get("interrupted")
+    assert interrupted.state == InvocationState.FAILED
+    assert interrupted.exception == "Interrupted by a restart of xOpera API."
+    assert interrupted.stdout == "partial output\n"
+    assert interrupted.stderr is None
+    assert store.get("finished").state == InvocationState.SUCCESS
@@ -0,0 +1,43 @@
+from opera.api.controllers.background_invocation import InvocationWorkerProcess
+from opera.api.controllers.invocation_logs import LogTail, parse_offset
+from opera.api.openapi.models import InvocationState
+
+
+def test_tail_holds_back_incomplete_lines_until_finished(store, make_invocation):
+    store.write(make_invocation("running", InvocationState.IN_PROGRESS))
+    log = InvocationWorkerProcess.log_path("running", "stdout")
+    log.write_text("first\nsec")
+
+    tail = LogTail("running", "stdout")
+    assert tail.poll() == ("id: 6\ndata: first\n\n", False)
+
+    with log.open(mode="a") as file:
+        file.write("ond")
+    assert tail.poll() == ("", False)
+
+    store.write(make_invocation("running", InvocationState.SUCCESS))
+    assert tail.poll() == ("id: 12\ndata: second\n\nevent: end\ndata: success\n\n", False)
+    assert tail.finished
+    assert tail.poll() == ("", False)
+
+
+def test_tail_reads_stored_output_without_log_file(store, make_invocation):
+    store.write(make_invocation("finished", InvocationState.FAILED, stderr="one\ntwo\n"))
+
+    tail = LogTail("finished", "stderr", offset=4)
+
+    assert tail.poll() == ("id: 8\ndata: two\n\nevent: end\ndata: failed\n\n", False)
+
+
+def test_tail_of_missing_invocation_ends(store):
+    tail = LogTail("missing", "stdout")
+
+    assert tail.poll() == ("event: end\ndata: \n\n", False)
+    assert tail.finished
+
+
+def test_parse_offset_prefers_last_event_id():
+    assert parse_offset(None, None) == 0
+    assert parse_offset("5", None) == 5
+    assert parse_offset("5", "7") == 7
+    assert parse_offset("-1", None) is None
@@ -0,0 +1,82 @@
+import json
+
+from opera.api.openapi.models import InvocationState
+
+
+def ids(invocations):
+    return [inv.id for inv in invocations]
+
+
+def test_get_and_exists(store, make_invocation):
+    store.write(make_invocation("first", InvocationState.PENDING, stdout="output"))
+
+    inv = store.get("first")
+    assert inv.id == "first"
+    assert inv.state == InvocationState.PENDING
+    assert inv.stdout == "output"
+    assert store.exists("first")
+
+    assert store.get("missing") is None
+    assert not store.exists("missing")
+
+
+def test_write_updates_in_place(store, make_invocation):
+    store.write(make_invocation("first", InvocationState.PENDING))
+    store.write(make_invocation("second", InvocationState.PENDING))
+    store.write(make_invocation("first", InvocationState.SUCCESS))
+
+    assert store.get("first").state == InvocationState.SUCCESS
+    assert ids(store.history()) == ["second", "first"]
+    assert ids(store.by_state(InvocationState.PENDING)) == ["second"]
+
+
+def test_history_pages_newest_first(store, make_invocation):
+    for index in range(5):
+        store.write(make_invocation("inv-{}".format(index)))
+
+    assert ids(store.history()) == ["inv-4", "inv-3", "inv-2", "inv-1", "inv-0"]
+    assert ids(store.history(limit=2)) == ["inv-4", "inv-3"]
+    assert ids(store.history(since="inv-2")) == ["inv-4", "inv-3"]
+    assert ids(store.history(before="inv-2")) == ["inv-1", "inv-0"]
+    assert ids(store.history(limit=1, before="inv-3", since="inv-0")) == ["inv-2"]
+    assert store.latest().id == "inv-4"
+
+
+def test_summaries_page_like_history(store, make_invocation):
+    for index in range(3):
+        store.write(make_invocation("inv-{}".format(index), stdout="output"))
+
+    summaries = store.summaries(limit=1, since="inv-0")
+    assert ids(summaries) == ["inv-2"]
+    assert summaries[0].state == InvocationState.SUCCESS
+    assert ids(store.summaries(before="inv-1")) == ["inv-0"]
+
+
+def test_empty_store(store):
+    assert store.history() == []
+    assert store.latest() is None
+
+
+def test_import_files_in_timestamp_order(store, make_invocation, tmp_path):
+    timestamps = {
+        "middle": "2023-01-02T00:00:00+00:00",
+        "newest": "2023-01-03T00:00:00+00:00",
+        "oldest": "2023-01-01T00:00:00+00:00",
+    }
+    for eye_dee, timestamp in timestamps.items():
+        inv = make_invocation(eye_dee, timestamp=timestamp)
+        (tmp_path / "invocation-{}.json".format(eye_dee)).write_text(json.dumps(inv.to_dict()))
+
+    store.import_files(tmp_path)
+
+    assert ids(store.history()) == ["newest", "middle", "oldest"]
+
+
+def test_import_files_only_into_empty_store(store, make_invocation, tmp_path):
+    store.write(make_invocation("stored"))
+    inv = make_invocation("legacy")
+    (tmp_path / "invocation-legacy.json").write_text(json.dumps(inv.to_dict()))
+
+    store.import_files(tmp_path)
+
+    assert ids(store.history()) == ["stored"]